@@ -77,7 +77,7 @@ if errorlevel 1 (
 
 REM NLP libraries
 echo [INFO] Installing Natural Language Processing libraries...
-python -m pip install textblob nltk
+python -m pip install "textblob>=0.15.0,<0.21" nltk
 if errorlevel 1 (
     echo [ERROR] Failed to install NLP libraries
     pause
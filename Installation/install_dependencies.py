@@ -230,7 +230,7 @@ def main():
         ("pandas", "Data analysis and manipulation"),
         ("openpyxl", "Excel file reading"),
         ("xlsxwriter", "Excel file writing"),
-        ("textblob", "Natural Language Processing"),
+        ("textblob>=0.15.0,<0.21", "Natural Language Processing"),
         ("nltk", "Natural Language Toolkit"),
         ("rouge-score", "ROUGE evaluation metrics"),
         ("tiktoken", "OpenAI tokenizer"),
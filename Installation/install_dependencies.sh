@@ -93,7 +93,7 @@ pip3 install openpyxl xlsxwriter --break-system-packages 2>/dev/null || pip3 ins
 
 # NLP libraries
 print_info "Installing Natural Language Processing libraries..."
-pip3 install textblob nltk --break-system-packages 2>/dev/null || pip3 install textblob nltk
+pip3 install "textblob>=0.15.0,<0.21" nltk --break-system-packages 2>/dev/null || pip3 install "textblob>=0.15.0,<0.21" nltk
 
 # ROUGE scorer
 print_info "Installing ROUGE evaluation metrics..."
@@ -29,31 +29,73 @@ Year: 2026
 
 """
 
+import argparse
+import hashlib
+import importlib.util
 import json
+import os
 import re
-from datetime import datetime
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
 import pandas as pd
+import xlsxwriter
 import numpy as np
 import tiktoken
 from textblob import TextBlob
 from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
 from nltk.translate.meteor_score import meteor_score
+from nltk.stem.porter import PorterStemmer
+from nltk.corpus import wordnet
 from rouge_score import rouge_scorer
-from collections import Counter, defaultdict
+from rouge_score import tokenize as rouge_tokenize
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
 from math import log2
-from itertools import islice
+from itertools import chain, islice
 from difflib import SequenceMatcher
 import warnings
 warnings.filterwarnings('ignore')
+try:
+    import resource  # peak memory in --profile output (not available on Windows)
+except ImportError:
+    resource = None
 
 # === Initialize tokenizer ===
 tokenizer = tiktoken.get_encoding("cl100k_base")
 
 # === Configuration ===
-input_file = "chat.json"  # Your ChatGPT export file
+input_file = "chat.json"  # Your ChatGPT export file (or pass export files / folders on the command line)
 timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
 main_output_file = f"gpt_analysis_{timestamp_str}.xlsx"          # v3.0 main output
 matrix_output_file = f"gpt_matrices_{timestamp_str}.xlsx"        # v3.1 matrix output
+dataset_output_dir = f"gpt_dataset_{timestamp_str}"              # Parquet dataset output (--output-format parquet/both)
+output_format = "xlsx"                                           # "xlsx" (workbooks), "parquet" (dataset) or "both"
+workers = 1                                                      # processes for parallel thread analysis (1 = sequential)
+pattern_engine = "scan"                                          # "scan" (per message) or "vectorized" (whole thread at once)
+cache_file = None                                                # SQLite metric cache for re-runs (None = no cache)
+cache_max_entries = 1_000_000                                    # LRU size cap of the metric cache
+incremental = False                                              # resume threads from state saved in the cache
+dedupe_keep = "latest"                                           # copy analyzed when exports repeat a conversation: "latest" or "longest"
+title_filter = None                                              # only conversations whose title matches this regex (None = all)
+conversation_ids = []                                            # only these conversation ids (empty = all)
+model_filter = []                                                # only conversations using one of these model_slugs (empty = all)
+min_messages = 0                                                 # skip conversations with fewer messages on the current branch
+shard = None                                                     # (i, N): analyze only the i-th of N hash shards (None = all)
+sample_fraction = None                                           # analyze a stable hash sample of this fraction (None = all)
+token_threads = 8                                                # tiktoken threads per batch encoding call
+token_memo_size = 100_000                                        # token counts remembered by content hash (0 = off)
+syllable_memo_size = 200_000                                     # distinct words whose syllable counts are remembered
+sentiment_backend = "lexicon"                                    # "lexicon" (batched) or "textblob" (reference)
+edit_similarity = "exact"                                        # "exact" or "tiered" (cheap bounds below the edit threshold)
+skip_mt_metrics = False                                          # drop the BLEU/METEOR/ROUGE columns entirely
+mt_memo_size = 200_000                                           # stems and WordNet synsets remembered for MT metrics
+branch_mode = "current"                                          # "current" = branch last shown in ChatGPT, "all" = also summarize every regenerated branch
+profile_file = None                                              # per-stage timing profile, .json or .csv (None = off)
+performance_sheet = False                                        # add the profile as a "Performance" sheet of the main workbook
 
 # === Enhanced Stopwords (expanded) ===
 stopwords = set([
@@ -189,6 +231,156 @@ TEMPORAL_PATTERNS = {
 # =============================================================================
 REFUSAL_PATTERNS = r'\b(as an ai|cannot|unable|sorry|policy|guidelines|restricted|harmful|legal advice|medical advice|violate)\b'
 
+# =============================================================================
+# LEXICON ENGINE: SINGLE-PASS PATTERN COUNTING
+# =============================================================================
+# Every pattern family counted per message. Each (family, category) pattern keeps
+# its own re.findall semantics; the scanner only changes how they are evaluated.
+LEXICON_FAMILIES = {
+    'contradiction': CONTRADICTION_PATTERNS,
+    'elaboration': ELABORATION_PATTERNS,
+    'epistemic': {'hedges': HEDGE_PATTERNS, 'confidence': CONFIDENCE_PATTERNS},
+    'cognitive_load': COGNITIVE_LOAD_PATTERNS,
+    'reference': REFERENCE_PATTERNS,
+    'affective': AFFECTIVE_PATTERNS,
+    'repair': REPAIR_PATTERNS,
+    'knowledge': KNOWLEDGE_PATTERNS,
+    'social_presence': SOCIAL_PRESENCE_PATTERNS,
+    'argumentation': ARGUMENTATION_PATTERNS,
+    'temporal': TEMPORAL_PATTERNS,
+    'refusal': {'refusal': REFUSAL_PATTERNS}
+}
+
+_PHRASE_LIST_PATTERN = re.compile(r'\\b\((.*)\)(\\b|\\s\+\\w\+)', re.S)
+_FOLLOWING_WORD = re.compile(r'\s+\w+')
+_WORD_RUN = re.compile(r'\w+')
+
+def _is_word_char(char):
+    """Same definition of a word character as the \\w class of re"""
+    return char.isalnum() or char == '_'
+
+def _parse_phrase_list(pattern):
+    """
+    Split a '\\b(a|b|c)\\b' or '\\b(a|b|c)\\s+\\w+' pattern into literal phrases.
+    Returns (phrases, follow_word) or None if the pattern is not a plain phrase list.
+    """
+    match = _PHRASE_LIST_PATTERN.fullmatch(pattern)
+    if not match or '\\|' in match.group(1):
+        return None
+    phrases = []
+    for alternative in match.group(1).split('|'):
+        unescaped = re.sub(r'\\.', '', alternative)
+        if re.search(r'\\[A-Za-z0-9]', alternative) or any(c in unescaped for c in '.^$*+?{}[]()|\\'):
+            return None
+        phrase = re.sub(r'\\(.)', r'\1', alternative).lower()
+        if not phrase or not _is_word_char(phrase[0]):
+            return None
+        phrases.append(phrase)
+    return phrases, match.group(2) != r'\b'
+
+def _trie_regex(words):
+    """Build a regex alternation shaped like a trie so each position is checked in O(word length)"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+# Letters that re.IGNORECASE matches to an ASCII letter but str.lower() does not lower to it
+_CASE_FOLDS = {0x130: "i", 0x131: "i", 0x17F: "s", 0x212A: "k"}   # İ ı ſ K (Kelvin sign)
+
+def _fold_case(text):
+    """Lower-case text so that literal ASCII phrases match it exactly where re.I would"""
+    return text.lower() if text.isascii() else text.translate(_CASE_FOLDS).lower()
+
+class LexiconScanner:
+    """
+    Count every lexicon family of a message in one pass over its text.
+
+    Each '\\b(a|b|c)\\b' pattern is split into its literal phrases, indexed by
+    their first word. A single trie-shaped regex finds the candidate words, and
+    only the phrases starting with that word are checked. The text is folded
+    like re.I folds it (_fold_case) and every pattern keeps the leftmost-first,
+    non-overlapping semantics of re.findall, so counts are identical to running
+    the patterns one by one with re.I. Patterns that are not plain phrase lists
+    fall back to re.findall.
+    """
+
+    def __init__(self, families):
+        self.families = families
+        self._slots = [(family, category) for family, patterns in families.items() for category in patterns]
+        self._index = defaultdict(list)   # first word -> [(slot, ((phrase, follow, ends_in_word), ...)), ...]
+        self._fallback = []               # [(slot, compiled pattern), ...]
+
+        for slot, (family, category) in enumerate(self._slots):
+            pattern = families[family][category]
+            parsed = _parse_phrase_list(pattern)
+            if parsed is None:
+                self._fallback.append((slot, re.compile(pattern, flags=re.I)))
+                continue
+            phrases, follow = parsed
+            by_first_word = defaultdict(list)
+            for phrase in phrases:
+                first_word = _WORD_RUN.match(phrase).group()
+                by_first_word[first_word].append((phrase, follow, _is_word_char(phrase[-1])))
+            for first_word, alternatives in by_first_word.items():
+                self._index[first_word].append((slot, tuple(alternatives)))
+
+        self._candidates = re.compile(r'\b' + _trie_regex(self._index) + r'\b') if self._index else None
+
+    def _match_end(self, text, start, phrase, follow, ends_in_word):
+        """End offset of phrase at start (with its trailing boundary or word), or None"""
+        if not text.startswith(phrase, start):
+            return None
+        end = start + len(phrase)
+        if follow:
+            following = _FOLLOWING_WORD.match(text, end)
+            return following.end() if following else None
+        next_is_word = end < len(text) and _is_word_char(text[end])
+        return end if ends_in_word != next_is_word else None
+
+    def scan(self, text):
+        """Return {family: {category: count}} for every pattern family (text: str or MessageTokens)"""
+        if isinstance(text, MessageTokens):
+            text = text.lower if text.text.isascii() else _fold_case(text.text)
+        else:
+            text = _fold_case(text)
+        counts = [0] * len(self._slots)
+        resume_at = [0] * len(self._slots)
+
+        if self._candidates is not None:
+            for candidate in self._candidates.finditer(text):
+                start = candidate.start()
+                for slot, alternatives in self._index[candidate.group()]:
+                    if start < resume_at[slot]:
+                        continue  # inside the previous match of this pattern
+                    for phrase, follow, ends_in_word in alternatives:
+                        end = self._match_end(text, start, phrase, follow, ends_in_word)
+                        if end is not None:
+                            counts[slot] += 1
+                            resume_at[slot] = end
+                            break
+
+        for slot, pattern in self._fallback:
+            counts[slot] = len(pattern.findall(text))
+
+        result = {family: {} for family in self.families}
+        for (family, category), count in zip(self._slots, counts):
+            result[family][category] = count
+        return result
+
+lexicon_scanner = LexiconScanner(LEXICON_FAMILIES)
+
 # === Helper Functions ===
 def extract_text_from_parts(parts):
     """Extract text from message parts (handles different formats)"""
@@ -200,32 +392,120 @@ def extract_text_from_parts(parts):
             texts.append(part["text"])
     return " ".join(texts).strip()
 
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 def convert_timestamp(ts):
-    """Convert various timestamp formats to standard format"""
+    """Epoch seconds of a create_time (a number or a TIMESTAMP_FORMAT string), NaN when missing or unreadable"""
     if not ts: 
-        return ""
+        return np.nan
+    if isinstance(ts, (int, float)):
+        return float(ts)
     try:
-        if isinstance(ts, (int, float)):
-            return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
-        return str(ts)
-    except:
-        return str(ts)
+        return datetime.strptime(str(ts), TIMESTAMP_FORMAT).timestamp()
+    except ValueError:
+        return np.nan
+
+def format_timestamps(epochs):
+    """Local-time TIMESTAMP_FORMAT strings of epoch seconds ("" when missing), for export only"""
+    formatted = []
+    for ts in epochs:
+        try:
+            formatted.append("" if np.isnan(ts) else datetime.fromtimestamp(ts).strftime(TIMESTAMP_FORMAT))
+        except (OverflowError, OSError, ValueError):
+            formatted.append("")
+    return formatted
 
 def count_words(text): 
     """Count words in text"""
     return len(text.split())
 
-def count_tokens(text): 
-    """Count tokens using tiktoken (GPT tokenizer)"""
-    return len(tokenizer.encode(text))
+
+_token_memo = OrderedDict()
+_token_memo_stats = {"hits": 0, "misses": 0}   # lookups in _token_memo, for --profile
+
+def count_tokens_batch(texts, cache=None):
+    """
+    Token counts of many texts at once.
+
+    Repeated texts are encoded once, counts are looked up by content hash (in
+    memory, then in the metric cache if given), and whatever is left is encoded
+    in a single multi-threaded tiktoken batch call.
+    """
+    counts = {}
+    digests = {text: hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest() for text in texts}
+    if token_memo_size:
+        for text, digest in digests.items():
+            if digest in _token_memo:
+                _token_memo.move_to_end(digest)
+                counts[text] = _token_memo[digest]
+        _token_memo_stats["hits"] += len(counts)
+        _token_memo_stats["misses"] += len(digests) - len(counts)
+    if cache is not None:
+        keys = {text: cache.key("tokens", text) for text in digests if text not in counts}
+        found = cache.get_many(list(keys.values()))
+        counts.update((text, found[key]) for text, key in keys.items() if key in found)
+    
+    missing = [text for text in digests if text not in counts]
+    if missing:
+        for text, tokens in zip(missing, tokenizer.encode_batch(missing, num_threads=token_threads)):
+            counts[text] = len(tokens)
+            if cache is not None:
+                cache.put(keys[text], counts[text])
+    
+    if token_memo_size:
+        for text, digest in digests.items():
+            _token_memo[digest] = counts[text]
+        while len(_token_memo) > token_memo_size:
+            _token_memo.popitem(last=False)
+    return [counts[text] for text in texts]
+
+def count_tokens(text):
+    """Count tokens using tiktoken (GPT tokenizer), through the memo of count_tokens_batch"""
+    return count_tokens_batch([text])[0]
 
 def count_sentences(text):
     """Count sentences in text"""
     return len(re.split(r'[.!?]+', text.strip()))
 
+_WORD_TOKEN = re.compile(r'\b\w+\b')
+
+class MessageTokens:
+    """
+    Every tokenization of one message, computed once and shared by all metric functions.
+
+    - words:          whitespace-separated words of the original text
+    - lower:          lower-cased text (what the pattern families scan)
+    - word_spans:     (start, end) of each \\b\\w+\\b word in `lower`
+    - word_tokens:    those words
+    - sentence_count: as count_sentences
+    - keywords:       set of word tokens that are not stopwords
+    """
+    __slots__ = ('text', 'lower', 'words', 'word_spans', 'word_tokens', 'sentence_count', 'keywords')
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+        self.words = text.split()
+        self.word_spans = [m.span() for m in _WORD_TOKEN.finditer(self.lower)]
+        self.word_tokens = [self.lower[start:end] for start, end in self.word_spans]
+        self.sentence_count = count_sentences(text)
+        self.keywords = set(self.word_tokens) - stopwords
+
+def as_message_tokens(text):
+    """MessageTokens of a message, reusing it when `text` already is one"""
+    return text if isinstance(text, MessageTokens) else MessageTokens(text)
+
+def as_text(text):
+    """Original text of a message given as a string or MessageTokens"""
+    return text.text if isinstance(text, MessageTokens) else text
+
 def count_syllables(word):
     """Estimate syllable count for readability"""
-    word = word.lower()
+    return _count_syllables_lower(word.lower())
+
+@lru_cache(maxsize=syllable_memo_size)
+def _count_syllables_lower(word):
+    """count_syllables of an already lower-cased word, memoized for the whole run"""
     vowels = 'aeiouy'
     syllables = 0
     previous_was_vowel = False
@@ -240,26 +520,192 @@ def count_syllables(word):
         syllables += 1
     return max(1, syllables)
 
-def compute_sentiment(text):
-    """Compute sentiment with continuous polarity score"""
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
+def count_thread_syllables(messages):
+    """
+    Total syllables of each message of a thread (str or MessageTokens), as compute_readability counts them
+    Every distinct word of the thread is normalized and scored once.
+    """
+    word_lists = [as_message_tokens(message).words for message in messages]
+    table = {word: count_syllables(word) for words in word_lists for word in set(words)}
+    return [sum(table[word] for word in words) for words in word_lists]
+
+def compute_sentiment(text, scores=None):
+    """
+    Compute sentiment with continuous polarity score
+    `scores` is a precomputed (polarity, subjectivity) pair from a sentiment backend
+    """
+    if scores is None:
+        scores = get_sentiment_backend(sentiment_backend).score_batch([as_text(text)])[0]
+    polarity, subjectivity = scores
     return {
         'label': "POSITIVE" if polarity > 0.05 else "NEGATIVE" if polarity < -0.05 else "NEUTRAL",
         'score': round(polarity, 3),
-        'subjectivity': round(blob.sentiment.subjectivity, 3)
+        'subjectivity': round(subjectivity, 3)
     }
 
+# === Sentiment Backends ===
+class TextBlobSentiment:
+    """Reference backend: one TextBlob per message"""
+
+    def score_batch(self, texts):
+        """(polarity, subjectivity) of each text"""
+        scores = []
+        for text in texts:
+            sentiment = TextBlob(text).sentiment
+            scores.append((sentiment.polarity, sentiment.subjectivity))
+        return scores
+
+class LexiconSentiment:
+    """
+    Batch scorer reproducing TextBlob's default (pattern) sentiment analyzer.
+
+    Uses TextBlob's own tokenizer and en-sentiment lexicon, flattened once into
+    plain dictionaries, and repeats its assessment rules (modifiers, negations,
+    exclamation marks, sarcasm, emoticons) with the same arithmetic, so scores
+    are identical. Repeated texts within a batch are scored once.
+    """
+
+    def __init__(self):
+        from textblob._text import EMOTICONS, PUNCTUATION
+        from textblob.en import sentiment as pattern_sentiment
+        self.tokenizer = pattern_sentiment.tokenizer
+        lexicon = dict(pattern_sentiment.items())   # items() loads the lexicon
+        self.scores = {word: tuple(tags[None]) for word, tags in lexicon.items()}
+        self.modifier_words = {word for word, tags in lexicon.items()
+                               if any(tag in tags for tag in pattern_sentiment.modifiers)}
+        self.negations = set(pattern_sentiment.negations)
+        self.punctuation = PUNCTUATION
+        self.emoticons = {}
+        for (_, polarity), emoticons in EMOTICONS.items():
+            for emoticon in emoticons:
+                self.emoticons.setdefault(emoticon.lower(), polarity)
+
+    def score(self, text):
+        """(polarity, subjectivity) of one text"""
+        scores, negations = self.scores, self.negations
+        assessments = []   # [polarity, subjectivity, intensity, negated]
+        modifier = None    # preceding known adverb ("really good")
+        negation = None    # preceding negation ("not good")
+        for word in (token.lower() for token in " ".join(self.tokenizer(text)).split()):
+            known = scores.get(word)
+            if known is not None:
+                polarity, subjectivity, intensity = known
+                if modifier is None:
+                    assessments.append([polarity, subjectivity, intensity, False])
+                else:
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(polarity * last[2], +1.0))
+                    last[1] = max(-1.0, min(subjectivity * last[2], +1.0))
+                    last[2] = intensity
+                if negation is not None:
+                    assessments[-1][2] = 1.0 / assessments[-1][2]
+                    assessments[-1][3] = True
+                modifier = word if word in self.modifier_words else None
+                negation = word if word in negations else None
+                continue
+            
+            if word in negations:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                assessments[-1][3] = True
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+            if word == "!" and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, +1.0))
+            if word == "(!)":
+                assessments.append([0.0, 1.0, 1.0, False])
+            if word.isalpha() is False and len(word) <= 5 and word not in self.punctuation:
+                polarity = self.emoticons.get(word)
+                if polarity is not None:
+                    assessments.append([polarity, 1.0, 1.0, False])
+        
+        polarity_sum, subjectivity_sum = 0, 0
+        for polarity, subjectivity, _, negated in assessments:
+            polarity_sum += polarity * -0.5 if negated else polarity
+            subjectivity_sum += subjectivity
+        count = float(len(assessments) or 1)
+        return polarity_sum / count, subjectivity_sum / count
+
+    def score_batch(self, texts):
+        """(polarity, subjectivity) of each text"""
+        unique = {text: None for text in texts}
+        for text in unique:
+            unique[text] = self.score(text)
+        return [unique[text] for text in texts]
+
+SENTIMENT_BACKENDS = {"lexicon": LexiconSentiment, "textblob": TextBlobSentiment}
+
+# Fixed corpus for --check-sentiment: every rule LexiconSentiment repeats from
+# TextBlob (negation, modifiers, "!", "(!)", emoticons) plus ordinary chat text
+SENTIMENT_PARITY_CORPUS = [
+    "",
+    "Okay.",
+    "This is good.",
+    "This is not good.",
+    "This isn't bad at all.",
+    "I never said it was wrong.",
+    "That is not a bad idea, not bad at all.",
+    "It is very good.",
+    "It is really very good.",
+    "It is not very good.",
+    "It is not really helpful.",
+    "It is really not good.",
+    "That is certainly not what I wanted.",
+    "The answer was extremely helpful and quite clear.",
+    "Slightly disappointing, but mostly fine.",
+    "That was incredibly stupid of me.",
+    "Absolutely wonderful work, truly excellent!",
+    "Great!",
+    "Great!!!",
+    "Terrible! Just terrible!",
+    "Not great!",
+    "Oh, that's just perfect (!)",
+    "Thanks :)",
+    "That did not work :(",
+    "Haha :D that's funny",
+    "Sure ;) whatever you say",
+    "I love it <3",
+    "Hmm :-/ not sure about that",
+    "Well :-) it could be worse :-(",
+    "WOW THIS IS AMAZING",
+    "this is amazing",
+    "Why is this so slow?",
+    "Can you explain how recursion works?",
+    "I don't think that's right, actually.",
+    "You're right, thank you so much for the detailed explanation.",
+    "The results are statistically significant but the effect size is small.",
+    "Could you make it shorter and less formal?",
+    "I'm frustrated; nothing I try works and the error keeps coming back.",
+    "It's fine, I guess, though not exactly what I wanted.",
+    "Neither option is ideal, but the second one is less risky.",
+    "No, no, no! That's the opposite of what I asked.",
+    "The old version was better, the new one is worse.",
+    "Honestly the first draft was brilliant and the revision ruined it.",
+    "Happy birthday! Have a wonderful day :)",
+    "As an AI, I cannot browse the internet, sorry.",
+    "Step 1: install the package. Step 2: run the script.",
+    "print('hello world')  # a simple test",
+    "Les résultats sont très bons, merci !",
+    "3.14 is approximately pi; 2 + 2 = 4.",
+    "Really?! That's unbelievable!",
+    "I am not unhappy with it, but I'm not thrilled either.",
+    "The movie was long, boring and painfully predictable, yet the ending was beautiful.",
+]
+_sentiment_backends = {}
+
+def get_sentiment_backend(name):
+    """Shared instance of a sentiment backend (built once per process)"""
+    if name not in _sentiment_backends:
+        _sentiment_backends[name] = SENTIMENT_BACKENDS[name]()
+    return _sentiment_backends[name]
+
 def compute_duration(timestamps):
-    """Calculate total conversation duration"""
-    dt_list = []
-    for ts in timestamps:
-        try: 
-            dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-            dt_list.append(dt)
-        except: 
-            continue
-    return str(max(dt_list) - min(dt_list)) if dt_list else ""
+    """Total conversation duration ("H:MM:SS") between the earliest and latest known timestamp (epoch seconds)"""
+    known = timestamps[~np.isnan(timestamps)]
+    return str(timedelta(seconds=round(known.max() - known.min()))) if len(known) else ""
 
 # === NEW v3.2: Cognitive Coupling Functions ===
 def compute_iei(entropy, word_count):
@@ -274,11 +720,11 @@ def compute_mirroring(source_text, target_text):
     Calculate Lexical Mirroring (Syntactic Alignment / Social Entrainment)
     Measures the overlap of significant words between consecutive turns.
     """
-    if not source_text or not target_text: 
+    if not as_text(source_text) or not as_text(target_text): 
         return 0
-    # Extract words longer than 3 characters
-    s_words = set(re.findall(r'\b\w{4,}\b', source_text.lower()))
-    t_words = set(re.findall(r'\b\w{4,}\b', target_text.lower()))
+    # Words longer than 3 characters (the same as \b\w{4,}\b matches)
+    s_words = {w for w in as_message_tokens(source_text).word_tokens if len(w) >= 4}
+    t_words = {w for w in as_message_tokens(target_text).word_tokens if len(w) >= 4}
     
     if not s_words: 
         return 0
@@ -286,32 +732,25 @@ def compute_mirroring(source_text, target_text):
     return round(len(overlap) / len(s_words), 4)
 
 # === Enhanced Structural Analysis ===
-def compute_enhanced_structural_metrics(text):
+def compute_enhanced_structural_metrics(text, lexicon=None):
     """
     Compute comprehensive structural metrics with pattern categorization
     Returns detailed breakdown of adversarial and elaborative language
     """
-    text_lower = text.lower()
+    if lexicon is None:
+        lexicon = lexicon_scanner.scan(text)
     
     # Count each type of contradiction
-    contradiction_counts = {}
-    total_contradictions = 0
-    for ctype, pattern in CONTRADICTION_PATTERNS.items():
-        count = len(re.findall(pattern, text_lower, flags=re.I))
-        contradiction_counts[ctype] = count
-        total_contradictions += count
+    contradiction_counts = lexicon['contradiction']
+    total_contradictions = sum(contradiction_counts.values())
     
     # Count each type of elaboration
-    elaboration_counts = {}
-    total_elaborations = 0
-    for etype, pattern in ELABORATION_PATTERNS.items():
-        count = len(re.findall(pattern, text_lower, flags=re.I))
-        elaboration_counts[etype] = count
-        total_elaborations += count
+    elaboration_counts = lexicon['elaboration']
+    total_elaborations = sum(elaboration_counts.values())
     
     # Epistemic markers
-    hedges = len(re.findall(HEDGE_PATTERNS, text_lower, flags=re.I))
-    confidence_markers = len(re.findall(CONFIDENCE_PATTERNS, text_lower, flags=re.I))
+    hedges = lexicon['epistemic']['hedges']
+    confidence_markers = lexicon['epistemic']['confidence']
     
     # Calculate ratios and complexity
     ratio = total_contradictions / total_elaborations if total_elaborations > 0 else float('inf')
@@ -341,19 +780,16 @@ def compute_enhanced_structural_metrics(text):
 # =============================================================================
 # NEW: COGNITIVE LOAD COMPUTATION
 # =============================================================================
-def compute_cognitive_load(text):
+def compute_cognitive_load(text, lexicon=None):
     """Compute cognitive load indicators"""
-    text_lower = text.lower()
+    if lexicon is None:
+        lexicon = lexicon_scanner.scan(text)
     
-    counts = {}
-    total_load = 0
-    for ctype, pattern in COGNITIVE_LOAD_PATTERNS.items():
-        count = len(re.findall(pattern, text_lower, flags=re.I))
-        counts[ctype] = count
-        total_load += count
+    counts = lexicon['cognitive_load']
+    total_load = sum(counts.values())
     
     # Compute density per 100 words
-    word_count = len(text.split())
+    word_count = len(as_message_tokens(text).words)
     density = (total_load / word_count * 100) if word_count > 0 else 0
     
     return {
@@ -369,51 +805,48 @@ def compute_cognitive_load(text):
 # =============================================================================
 # NEW: DISCOURSE COHERENCE COMPUTATION
 # =============================================================================
-def compute_coherence_chains(text, previous_text=None):
+def compute_entity_continuity(text, previous_text=None):
+    """Proportion of the previous turn's keywords carried over into this turn"""
+    if not previous_text:
+        return None
+    prev_words = as_message_tokens(previous_text).keywords
+    curr_words = as_message_tokens(text).keywords
+    if not prev_words:
+        return None
+    continuity_score = len(prev_words & curr_words) / len(prev_words)
+    return round(continuity_score, 3) if continuity_score else None
+
+def compute_coherence_chains(text, previous_text=None, lexicon=None):
     """Compute discourse coherence markers"""
-    text_lower = text.lower()
+    if lexicon is None:
+        lexicon = lexicon_scanner.scan(text)
     
-    counts = {}
-    total_references = 0
-    for ctype, pattern in REFERENCE_PATTERNS.items():
-        count = len(re.findall(pattern, text_lower, flags=re.I))
-        counts[ctype] = count
-        total_references += count
+    counts = lexicon['reference']
+    total_references = sum(counts.values())
     
     # Compute referential density
-    word_count = len(text.split())
+    word_count = len(as_message_tokens(text).words)
     ref_density = (total_references / word_count * 100) if word_count > 0 else 0
     
-    # If previous text provided, compute continuity
-    continuity_score = None
-    if previous_text:
-        prev_words = set(re.findall(r'\b\w+\b', previous_text.lower())) - stopwords
-        curr_words = set(re.findall(r'\b\w+\b', text_lower)) - stopwords
-        if prev_words:
-            continuity_score = len(prev_words & curr_words) / len(prev_words)
-    
     return {
         'reference_density': round(ref_density, 2),
         'anaphoric_references': counts.get('anaphoric', 0),
         'demonstrative_references': counts.get('demonstrative', 0),
         'comparative_references': counts.get('comparative', 0),
         'continuity_markers': counts.get('continuity', 0),
-        'entity_continuity': round(continuity_score, 3) if continuity_score else None
+        'entity_continuity': compute_entity_continuity(text, previous_text)
     }
 
 # =============================================================================
 # NEW: AFFECTIVE TRAJECTORY COMPUTATION
 # =============================================================================
-def compute_affective_trajectory(text):
+def compute_affective_trajectory(text, lexicon=None):
     """Compute multi-dimensional affective state beyond polarity"""
-    text_lower = text.lower()
+    if lexicon is None:
+        lexicon = lexicon_scanner.scan(text)
     
-    scores = {}
-    total_affective = 0
-    for emotion, pattern in AFFECTIVE_PATTERNS.items():
-        count = len(re.findall(pattern, text_lower, flags=re.I))
-        scores[emotion] = count
-        total_affective += count
+    scores = lexicon['affective']
+    total_affective = sum(scores.values())
     
     # Determine dominant affect
     dominant = max(scores, key=scores.get) if scores else 'neutral'
@@ -437,16 +870,13 @@ def compute_affective_trajectory(text):
 # =============================================================================
 # NEW: REPAIR PATTERN COMPUTATION
 # =============================================================================
-def compute_repair_patterns(text, role='unknown'):
+def compute_repair_patterns(text, role='unknown', lexicon=None):
     """Compute conversational repair and maintenance patterns"""
-    text_lower = text.lower()
+    if lexicon is None:
+        lexicon = lexicon_scanner.scan(text)
     
-    counts = {}
-    total_repairs = 0
-    for rtype, pattern in REPAIR_PATTERNS.items():
-        count = len(re.findall(pattern, text_lower, flags=re.I))
-        counts[rtype] = count
-        total_repairs += count
+    counts = lexicon['repair']
+    total_repairs = sum(counts.values())
     
     # Classify repair type
     if counts.get('self_correction', 0) > 0:
@@ -473,16 +903,13 @@ def compute_repair_patterns(text, role='unknown'):
 # =============================================================================
 # NEW: KNOWLEDGE CONSTRUCTION COMPUTATION
 # =============================================================================
-def compute_knowledge_construction(text):
+def compute_knowledge_construction(text, lexicon=None):
     """Compute collaborative knowledge building markers"""
-    text_lower = text.lower()
+    if lexicon is None:
+        lexicon = lexicon_scanner.scan(text)
     
-    counts = {}
-    total_markers = 0
-    for ktype, pattern in KNOWLEDGE_PATTERNS.items():
-        count = len(re.findall(pattern, text_lower, flags=re.I))
-        counts[ktype] = count
-        total_markers += count
+    counts = lexicon['knowledge']
+    total_markers = sum(counts.values())
     
     # Determine knowledge phase
     if counts.get('hypothesis', 0) > counts.get('synthesis', 0):
@@ -507,16 +934,13 @@ def compute_knowledge_construction(text):
 # =============================================================================
 # NEW: SOCIAL PRESENCE COMPUTATION
 # =============================================================================
-def compute_social_presence(text):
+def compute_social_presence(text, lexicon=None):
     """Compute social presence and rapport indicators"""
-    text_lower = text.lower()
+    if lexicon is None:
+        lexicon = lexicon_scanner.scan(text)
     
-    counts = {}
-    total_social = 0
-    for stype, pattern in SOCIAL_PRESENCE_PATTERNS.items():
-        count = len(re.findall(pattern, text_lower, flags=re.I))
-        counts[stype] = count
-        total_social += count
+    counts = lexicon['social_presence']
+    total_social = sum(counts.values())
     
     # Compute rapport score (weighted toward solidarity and acknowledgment)
     rapport = (counts.get('solidarity', 0) * 2 + 
@@ -537,13 +961,12 @@ def compute_social_presence(text):
 # =============================================================================
 # NEW: ARGUMENTATION STRUCTURE COMPUTATION
 # =============================================================================
-def compute_argumentation_structure(text):
+def compute_argumentation_structure(text, lexicon=None):
     """Compute argumentation structure components (Toulmin model inspired)"""
-    text_lower = text.lower()
+    if lexicon is None:
+        lexicon = lexicon_scanner.scan(text)
     
-    counts = {}
-    for atype, pattern in ARGUMENTATION_PATTERNS.items():
-        counts[atype] = len(re.findall(pattern, text_lower, flags=re.I))
+    counts = lexicon['argumentation']
     
     # Determine argument structure completeness
     has_claim = counts.get('claim', 0) > 0
@@ -575,13 +998,12 @@ def compute_argumentation_structure(text):
 # =============================================================================
 # NEW: TEMPORAL DYNAMICS COMPUTATION
 # =============================================================================
-def compute_temporal_dynamics(text, response_time=None):
+def compute_temporal_dynamics(text, response_time=None, lexicon=None):
     """Compute temporal and pacing markers"""
-    text_lower = text.lower()
+    if lexicon is None:
+        lexicon = lexicon_scanner.scan(text)
     
-    counts = {}
-    for ttype, pattern in TEMPORAL_PATTERNS.items():
-        counts[ttype] = len(re.findall(pattern, text_lower, flags=re.I))
+    counts = lexicon['temporal']
     
     # Determine temporal orientation
     reflection = counts.get('reflection', 0)
@@ -626,69 +1048,789 @@ def classify_question_type(text):
     else:
         return 'other'
 
-# === Recursive Extraction (maintaining original structure) ===
-def extract_messages(mapping):
-    """Extract messages from ChatGPT JSON mapping structure"""
-    messages_list = []
-    message = mapping.get("message")
+# =============================================================================
+# VECTORIZED PATTERN ENGINE (whole-thread counting)
+# =============================================================================
+# Joins a thread's messages with a separator no pattern can match across, so each
+# pattern runs once over the whole thread and every match is assigned back to its
+# message. Produces the same columns as the per-message compute_* functions.
+_MESSAGE_SEPARATOR = "\n\x00\n"
+
+def count_pattern_matrix(texts, families=LEXICON_FAMILIES):
+    """
+    Count every pattern of every family over a batch of messages at once.
+    Returns {family: {category: int64 array with one count per message}}.
+    """
+    lowered = pd.Series(texts, dtype=object).str.lower()
+    n_messages = len(lowered)
+    lengths = lowered.str.len().to_numpy(dtype=np.int64) + len(_MESSAGE_SEPARATOR)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    corpus = lowered.str.cat(sep=_MESSAGE_SEPARATOR)
+    
+    counts = {}
+    for family, patterns in families.items():
+        counts[family] = {}
+        for category, pattern in patterns.items():
+            positions = np.fromiter((m.start() for m in re.finditer(pattern, corpus, flags=re.I)), dtype=np.int64)
+            owners = np.searchsorted(starts, positions, side='right') - 1
+            counts[family][category] = np.bincount(owners, minlength=n_messages)
+    return counts
+
+def _rounded(values, digits):
+    """Python round() of every element, matching the per-message functions exactly"""
+    return [round(v, digits) for v in np.asarray(values, dtype=np.float64).tolist()]
+
+def _per_100_words(totals, word_counts):
+    """Markers per 100 words, 0 for empty messages"""
+    safe_counts = np.where(word_counts > 0, word_counts, 1)
+    return _rounded(np.where(word_counts > 0, totals / safe_counts * 100, 0), 2)
+
+def compute_pattern_columns(texts):
+    """
+    Vectorized equivalent of every pattern-based compute_* function for a thread.
+    Returns {MESSAGE_METRICS source: {result key: column values}}.
+    """
+    counts = count_pattern_matrix(texts)
+    word_counts = pd.Series(texts, dtype=object).str.split().str.len().to_numpy(dtype=np.int64)
+    
+    # Structural (contradiction, elaboration, epistemic)
+    contra, elab, epistemic = counts['contradiction'], counts['elaboration'], counts['epistemic']
+    total_contra = sum(contra.values())
+    total_elab = sum(elab.values())
+    ratio = np.divide(total_contra, total_elab, out=np.full(len(word_counts), np.inf), where=total_elab > 0)
+    structural = {
+        'total_contradictions': total_contra,
+        'total_elaborations': total_elab,
+        'contradiction_ratio': _rounded(ratio, 2),
+        'negations': contra['negation'],
+        'adversatives': contra['adversative'],
+        'hedges': epistemic['hedges'],
+        'confidence_markers': epistemic['confidence'],
+        'epistemic_stance': epistemic['confidence'] - epistemic['hedges']
+    }
+    
+    # Cognitive load
+    cog = counts['cognitive_load']
+    cog_total = sum(cog.values())
+    cognitive_load = {
+        'cognitive_load_total': cog_total,
+        'cognitive_load_density': _per_100_words(cog_total, word_counts),
+        'complex_connectors': cog['complex_connectors'],
+        'abstraction_markers': cog['abstraction'],
+        'metacognitive_markers': cog['metacognition'],
+        'computational_markers': cog['computational'],
+        'conditional_complexity': cog['conditional']
+    }
+    
+    # Coherence (entity continuity needs the previous turn and stays per message)
+    ref = counts['reference']
+    coherence = {
+        'reference_density': _per_100_words(sum(ref.values()), word_counts),
+        'anaphoric_references': ref['anaphoric'],
+        'demonstrative_references': ref['demonstrative'],
+        'comparative_references': ref['comparative'],
+        'continuity_markers': ref['continuity']
+    }
+    
+    # Affective trajectory: first emotion with the highest count, as max() does
+    aff = counts['affective']
+    emotions = list(aff)
+    aff_matrix = np.column_stack([aff[e] for e in emotions])
+    dominant = np.array(emotions, dtype=object)[aff_matrix.argmax(axis=1)]
+    affective = {
+        'dominant_affect': np.where(aff_matrix.max(axis=1) > 0, dominant, 'neutral').tolist(),
+        'affective_intensity': aff_matrix.sum(axis=1),
+        'affective_diversity': (aff_matrix > 0).sum(axis=1),
+        'curiosity_score': aff['curiosity'],
+        'confusion_score': aff['confusion'],
+        'satisfaction_score': aff['satisfaction'],
+        'frustration_score': aff['frustration'],
+        'surprise_score': aff['surprise'],
+        'engagement_score': aff['engagement']
+    }
+    
+    # Repair patterns
+    rep = counts['repair']
+    repair = {
+        'total_repair_markers': sum(rep.values()),
+        'repair_type': np.select(
+            [rep['self_correction'] > 0, rep['clarification_request'] > 0,
+             rep['confirmation_check'] > 0, rep['elaboration_request'] > 0],
+            ['self_repair', 'other_repair_request', 'confirmation', 'elaboration_request'], 'none').tolist(),
+        'self_corrections': rep['self_correction'],
+        'clarification_requests': rep['clarification_request'],
+        'confirmation_checks': rep['confirmation_check'],
+        'elaboration_requests': rep['elaboration_request'],
+        'repetitions': rep['repetition']
+    }
+    
+    # Knowledge construction
+    know = counts['knowledge']
+    knowledge = {
+        'knowledge_construction_score': sum(know.values()),
+        'construction_phase': np.select(
+            [know['hypothesis'] > know['synthesis'], know['evidence'] > 0, know['synthesis'] > 0],
+            ['hypothesis_generation', 'evidence_evaluation', 'synthesis_integration'],
+            'information_exchange').tolist(),
+        'joint_attention_markers': know['joint_attention'],
+        'hypothesis_markers': know['hypothesis'],
+        'evidence_markers': know['evidence'],
+        'synthesis_markers': know['synthesis'],
+        'perspective_markers': know['perspective']
+    }
+    
+    # Social presence
+    soc = counts['social_presence']
+    social_presence = {
+        'social_presence_score': sum(soc.values()),
+        'rapport_index': _rounded(soc['solidarity'] * 2 + soc['acknowledgment'] * 1.5 + soc['empathy'], 2),
+        'acknowledgments': soc['acknowledgment'],
+        'encouragements': soc['encouragement'],
+        'empathy_markers': soc['empathy'],
+        'solidarity_markers': soc['solidarity'],
+        'politeness_markers': soc['politeness'],
+        'humor_markers': soc['humor']
+    }
+    
+    # Argumentation structure
+    arg = counts['argumentation']
+    has_claim, has_evidence, has_warrant = arg['claim'] > 0, arg['evidence_marker'] > 0, arg['warrant'] > 0
+    argumentation = {
+        'argument_structure': np.select(
+            [has_claim & has_evidence & has_warrant, has_claim & has_evidence, has_claim],
+            ['complete_argument', 'claim_evidence', 'assertion_only'], 'no_explicit_argument').tolist(),
+        'argument_quality': (has_claim.astype(np.int64) + has_evidence + has_warrant + (arg['qualifier'] > 0)),
+        'claim_markers': arg['claim'],
+        'evidence_markers': arg['evidence_marker'],
+        'warrant_markers': arg['warrant'],
+        'qualifier_markers': arg['qualifier'],
+        'rebuttal_markers': arg['rebuttal']
+    }
+    
+    # Temporal dynamics
+    temp = counts['temporal']
+    temporal = {
+        'temporal_orientation': np.select(
+            [temp['reflection'] > temp['projection'], temp['projection'] > temp['reflection']],
+            ['past_focused', 'future_focused'], 'present_focused').tolist(),
+        'urgency_level': np.select([temp['urgency'] > 2, temp['urgency'] > 0], ['high', 'medium'], 'low').tolist(),
+        'urgency_markers': temp['urgency'],
+        'reflection_markers': temp['reflection'],
+        'projection_markers': temp['projection'],
+        'pace_markers': temp['pace_marker']
+    }
+    
+    return {
+        'structural': structural,
+        'cognitive_load': cognitive_load,
+        'coherence': coherence,
+        'affective': affective,
+        'repair': repair,
+        'knowledge': knowledge,
+        'social_presence': social_presence,
+        'argumentation': argumentation,
+        'temporal': temporal,
+        'refusal': counts['refusal']['refusal']
+    }
+
+# =============================================================================
+# METRIC REGISTRY: COLUMNAR PER-MESSAGE STORAGE
+# =============================================================================
+# Every per-message metric column, in sheet order, grouped by the result that
+# feeds it: source -> [(key in the compute_* result or None for a scalar, column, kind)].
+# Kinds: 'int' and 'float' are typed NumPy columns, 'optional' is a float column
+# that stays empty (None) when no row has a value, 'label' holds strings.
+MESSAGE_METRICS = {
+    'sentiment': [('label', 'sentiment', 'label'), ('score', 'sentiment_score', 'float'),
+                  ('subjectivity', 'subjectivity', 'float')],
+    'mt': [('bleu', 'BLEU', 'optional'), ('meteor', 'METEOR', 'optional'),
+           ('rouge1', 'ROUGE-1', 'optional'), ('rougeL', 'ROUGE-L', 'optional')],
+    'entropy': [(None, 'Entropy', 'float')],
+    'readability': [(None, 'Readability', 'float')],
+    'lexical_richness': [('ttr', 'Lexical Diversity', 'float')],
+    'structural': [('total_contradictions', 'Contradictions', 'int'), ('total_elaborations', 'Elaborations', 'int'),
+                   ('contradiction_ratio', 'Contra:Elab Ratio', 'float'), ('negations', 'Negations', 'int'),
+                   ('adversatives', 'Adversatives', 'int'), ('hedges', 'Hedges', 'int'),
+                   ('confidence_markers', 'Confidence Markers', 'int'), ('epistemic_stance', 'Epistemic Stance', 'int')],
+    'cognitive_load': [('cognitive_load_total', 'Cognitive_Load_Total', 'int'),
+                       ('cognitive_load_density', 'Cognitive_Load_Density', 'float'),
+                       ('complex_connectors', 'Complex_Connectors', 'int'),
+                       ('abstraction_markers', 'Abstraction_Markers', 'int'),
+                       ('metacognitive_markers', 'Metacognitive_Markers', 'int'),
+                       ('computational_markers', 'Computational_Markers', 'int'),
+                       ('conditional_complexity', 'Conditional_Complexity', 'int')],
+    'coherence': [('reference_density', 'Reference_Density', 'float'),
+                  ('anaphoric_references', 'Anaphoric_Refs', 'int'),
+                  ('demonstrative_references', 'Demonstrative_Refs', 'int'),
+                  ('comparative_references', 'Comparative_Refs', 'int'),
+                  ('continuity_markers', 'Continuity_Markers', 'int')],
+    'entity_continuity': [(None, 'Entity_Continuity', 'optional')],
+    'affective': [('dominant_affect', 'Dominant_Affect', 'label'), ('affective_intensity', 'Affective_Intensity', 'int'),
+                  ('affective_diversity', 'Affective_Diversity', 'int'), ('curiosity_score', 'Curiosity_Score', 'int'),
+                  ('confusion_score', 'Confusion_Score', 'int'), ('satisfaction_score', 'Satisfaction_Score', 'int'),
+                  ('frustration_score', 'Frustration_Score', 'int'), ('surprise_score', 'Surprise_Score', 'int'),
+                  ('engagement_score', 'Engagement_Score', 'int')],
+    'repair': [('total_repair_markers', 'Total_Repair_Markers', 'int'), ('repair_type', 'Repair_Type', 'label'),
+               ('self_corrections', 'Self_Corrections', 'int'),
+               ('clarification_requests', 'Clarification_Requests', 'int'),
+               ('confirmation_checks', 'Confirmation_Checks', 'int'),
+               ('elaboration_requests', 'Elaboration_Requests', 'int'), ('repetitions', 'Repetitions', 'int')],
+    'knowledge': [('knowledge_construction_score', 'Knowledge_Construction_Score', 'int'),
+                  ('construction_phase', 'Construction_Phase', 'label'),
+                  ('joint_attention_markers', 'Joint_Attention', 'int'),
+                  ('hypothesis_markers', 'Hypothesis_Markers', 'int'),
+                  ('evidence_markers', 'Evidence_Markers', 'int'),
+                  ('synthesis_markers', 'Synthesis_Markers', 'int'),
+                  ('perspective_markers', 'Perspective_Markers', 'int')],
+    'social_presence': [('social_presence_score', 'Social_Presence_Score', 'int'),
+                        ('rapport_index', 'Rapport_Index', 'float'), ('acknowledgments', 'Acknowledgments', 'int'),
+                        ('encouragements', 'Encouragements', 'int'), ('empathy_markers', 'Empathy_Markers', 'int'),
+                        ('solidarity_markers', 'Solidarity_Markers', 'int'),
+                        ('politeness_markers', 'Politeness_Markers', 'int'), ('humor_markers', 'Humor_Markers', 'int')],
+    'argumentation': [('argument_structure', 'Argument_Structure', 'label'),
+                      ('argument_quality', 'Argument_Quality', 'int'), ('claim_markers', 'Claim_Markers', 'int'),
+                      ('evidence_markers', 'Argument_Evidence_Markers', 'int'),
+                      ('warrant_markers', 'Warrant_Markers', 'int'), ('qualifier_markers', 'Qualifier_Markers', 'int'),
+                      ('rebuttal_markers', 'Rebuttal_Markers', 'int')],
+    'temporal': [('temporal_orientation', 'Temporal_Orientation', 'label'), ('urgency_level', 'Urgency_Level', 'label'),
+                 ('urgency_markers', 'Urgency_Markers', 'int'), ('reflection_markers', 'Reflection_Markers', 'int'),
+                 ('projection_markers', 'Projection_Markers', 'int'), ('pace_markers', 'Pace_Markers', 'int')],
+    'coupling': [('iei', 'IEI_Efficiency', 'float'), ('mirroring', 'Lexical_Mirroring', 'float'),
+                 ('asymmetry', 'Cognitive_Asymmetry', 'float')],
+    'refusal': [(None, 'Refusal_Markers', 'int')]
+}
+
+_METRIC_KIND_STORAGE = {
+    # kind -> (dtype, fill value)
+    'int': (np.int64, 0),
+    'float': (np.float64, np.nan),
+    'optional': (np.float64, np.nan),
+    'label': (object, None)
+}
+
+class MetricColumns:
+    """
+    Preallocated, typed NumPy columns for every per-message metric of a thread.
+
+    compute_* results are written row by row into their registered columns, and
+    the whole block is joined to the thread DataFrame in one concatenation.
+    """
+
+    def __init__(self, n_rows, registry=MESSAGE_METRICS):
+        self.registry = registry
+        self.arrays = {}
+        self.kinds = {}
+        for fields in registry.values():
+            for _, column, kind in fields:
+                dtype, fill = _METRIC_KIND_STORAGE[kind]
+                self.arrays[column] = np.full(n_rows, fill, dtype=dtype)
+                self.kinds[column] = kind
+
+    def write(self, row, source, values):
+        """Store one compute_* result (or a scalar for single-column sources) at a row"""
+        for key, column, _ in self.registry[source]:
+            self.arrays[column][row] = values if key is None else values[key]
+
+    def write_columns(self, source, values, rows=slice(None)):
+        """Store whole columns at once (vectorized results: arrays instead of scalars)"""
+        for key, column, _ in self.registry[source]:
+            self.arrays[column][rows] = values if key is None else values[key]
+
+    def row_values(self, row):
+        """All metric values of one row as plain Python values, in column order"""
+        return [v.item() if isinstance(v, np.generic) else v for v in (a[row] for a in self.arrays.values())]
+
+    def write_row(self, row, values):
+        """Store a full row previously returned by row_values"""
+        for array, value in zip(self.arrays.values(), values):
+            array[row] = value
+
+    def to_frame(self, index=None):
+        """Assemble all columns into one DataFrame"""
+        columns = {}
+        for column, values in self.arrays.items():
+            if self.kinds[column] == 'optional' and np.isnan(values).all():
+                values = np.full(len(values), None, dtype=object)
+            columns[column] = values
+        return pd.DataFrame(columns, index=index)
+
+# =============================================================================
+# PERSISTENT METRIC CACHE
+# =============================================================================
+# Bump when a compute_* function changes behaviour. Pattern dictionaries, stopwords
+# and the metric registry are hashed in automatically, so editing them invalidates
+# every cached entry on the next run.
+METRIC_CACHE_VERSION = "3.2.1"
+
+def metric_cache_version():
+    """Version string of everything cached metric values depend on"""
+    digest = hashlib.sha256()
+    for part in (METRIC_CACHE_VERSION, LEXICON_FAMILIES, sorted(stopwords), MESSAGE_METRICS):
+        digest.update(repr(part).encode("utf-8"))
+    return f"{METRIC_CACHE_VERSION}-{digest.hexdigest()[:16]}"
+
+class MetricCache:
+    """
+    Content-addressed SQLite store of per-message metrics, shared across runs.
+
+    Entries are keyed by a hash of the metric version and the inputs they were
+    computed from (message content, previous message content, role). Lookups
+    refresh an entry's last-used time; evict() trims the store to max_entries
+    by dropping the least recently used entries. Writes are buffered and
+    flushed once per thread, so several worker processes can share one file.
+    
+    The same file keeps each thread's saved state for --incremental runs.
+    """
+
+    def __init__(self, path, max_entries=cache_max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.version = metric_cache_version()
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS metrics "
+                          "(key BLOB PRIMARY KEY, version TEXT, value TEXT, last_used REAL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS thread_state "
+                          "(conversation_id TEXT PRIMARY KEY, version TEXT, state TEXT)")
+        self.conn.commit()
+        self.pending = {}
+        self.touched = set()
+        self.hits = self.misses = 0
+
+    def key(self, *parts):
+        """Hash of the metric version and the inputs a cached value depends on"""
+        digest = hashlib.sha256(self.version.encode("utf-8"))
+        for part in parts:
+            data = str(part).encode("utf-8")
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+        return digest.digest()
+
+    def get_many(self, keys):
+        """Return {key: value} for every key present in the cache"""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, value FROM metrics WHERE key IN ({','.join('?' * len(batch))})", batch)
+            found.update((bytes(k), json.loads(v)) for k, v in rows)
+        for key in keys:
+            if key in self.pending:
+                found[key] = self.pending[key]
+        self.touched.update(found)
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def get(self, key):
+        """Cached value of one key, or None"""
+        return self.get_many([key]).get(key)
+
+    def put(self, key, value):
+        """Buffer a value for the next flush()"""
+        self.pending[key] = value
+
+    def flush(self):
+        """Write buffered values and refresh last-used times of hits"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?, ?)",
+                                  [(k, self.version, json.dumps(v), now) for k, v in self.pending.items()])
+            self.conn.executemany("UPDATE metrics SET last_used = ? WHERE key = ?",
+                                  [(now, k) for k in self.touched - self.pending.keys()])
+        self.pending.clear()
+        self.touched.clear()
+
+    def get_thread_state(self, conversation_id):
+        """State saved by put_thread_state for a conversation, or None"""
+        row = self.conn.execute("SELECT state FROM thread_state WHERE conversation_id = ? AND version = ?",
+                                (conversation_id, self.version)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_thread_state(self, conversation_id, state):
+        """Save a thread's state so the next --incremental run can resume from it"""
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO thread_state VALUES (?, ?, ?)",
+                              (conversation_id, self.version, json.dumps(state, default=lambda v: v.item())))
+
+    def purge_stale(self):
+        """Drop entries computed with other pattern dictionaries or metric versions"""
+        with self.conn:
+            purged = self.conn.execute("DELETE FROM metrics WHERE version != ?", (self.version,)).rowcount
+            purged += self.conn.execute("DELETE FROM thread_state WHERE version != ?", (self.version,)).rowcount
+            return purged
+
+    def clear(self):
+        """Drop every entry and saved thread state"""
+        with self.conn:
+            self.conn.execute("DELETE FROM metrics")
+            self.conn.execute("DELETE FROM thread_state")
+
+    def evict(self):
+        """Trim the cache to max_entries, least recently used first"""
+        with self.conn:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM metrics").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self.conn.execute("DELETE FROM metrics WHERE key IN "
+                                  "(SELECT key FROM metrics ORDER BY last_used LIMIT ?)", (excess,))
+            return max(excess, 0)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+def thread_prefix_digest(messages):
+    """Hash of the extracted messages, to check that a thread only grew since its state was saved"""
+    digest = hashlib.sha256()
+    for m in messages:
+        digest.update(json.dumps([m["role"], m["content"], m["timestamp"], m["model"], m["parts"]],
+                                 default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+_metric_caches = {}
+
+def get_metric_cache(options):
+    """The metric cache of this process for the given options, or None when disabled"""
+    if not getattr(options, "cache", None):
+        return None
+    # Keyed by pid as well: SQLite connections must not cross a fork into workers
+    slot = (os.getpid(), options.cache)
+    if slot not in _metric_caches:
+        _metric_caches[slot] = MetricCache(options.cache, options.cache_max_entries)
+    return _metric_caches[slot]
+
+# === Streaming Ingestion ===
+_JSON_GAP = re.compile(r'[\s,]*')
+
+def iter_conversations(path, chunk_size=1 << 20):
+    """
+    Yield conversations one at a time from the top-level array of an export.
+
+    The file is read in chunks and each array element is decoded with
+    JSONDecoder.raw_decode as soon as it is complete, so only the conversation
+    being decoded is held in memory and exports larger than RAM can be analyzed.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, pos = f.read(chunk_size), 0
+        in_array = False
+        while True:
+            pos = _JSON_GAP.match(buffer, pos).end()
+            if pos == len(buffer):
+                buffer, pos = f.read(chunk_size), 0
+                if not buffer:
+                    raise ValueError(f"{path}: unexpected end of file, expected a JSON array of conversations")
+                continue
+            
+            if not in_array:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{path}: expected a JSON array of conversations")
+                in_array = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            
+            try:
+                conversation, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Conversation not complete yet: grow the buffer geometrically and retry
+                more = f.read(max(chunk_size, len(buffer) - pos))
+                if not more:
+                    raise
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield conversation
+
+def export_files(inputs):
+    """Export files named by `inputs`: files as given, directories expanded to their .json files (sorted by name)"""
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            paths.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(".json")))
+        else:
+            paths.append(path)
+    return paths
+
+def conversation_id_of(conversation):
+    return conversation.get("conversation_id") or conversation.get("id")
+
+def conversation_rank(conversation, keep):
+    """Sort key of one copy of a conversation; of several copies the highest is analyzed"""
+    nodes = len(conversation.get("mapping") or {})
+    updated = convert_timestamp(conversation.get("update_time") or conversation.get("create_time"))
+    updated = -np.inf if np.isnan(updated) else updated
+    return (nodes, updated) if keep == "longest" else (updated, nodes)
+
+def iter_unique_conversations(paths, keep="latest"):
+    """
+    Yield the conversations of several exports, each conversation id only once.
+
+    Snapshots repeat every earlier conversation, so a first streaming pass only
+    ranks the copies of each id (`keep`: "latest" update_time or "longest"
+    mapping; ties go to the later file) and remembers where the chosen copy is.
+    A second pass streams the files again and yields the chosen copies in file
+    order. Conversations without an id are always kept. A single file is
+    streamed once, as it is.
+    """
+    if len(paths) == 1:
+        yield from iter_conversations(paths[0])
+        return
+    
+    chosen = {}   # conversation id -> (rank, file index, position in file)
+    copies = 0
+    for file_idx, path in enumerate(paths):
+        for position, conversation in enumerate(iter_conversations(path)):
+            conversation_id = conversation_id_of(conversation)
+            if conversation_id is None:
+                continue
+            copies += 1
+            rank = conversation_rank(conversation, keep)
+            if conversation_id not in chosen or rank >= chosen[conversation_id][0]:
+                chosen[conversation_id] = (rank, file_idx, position)
+    keep_at = {(file_idx, position) for _, file_idx, position in chosen.values()}
+    print(f"{len(paths)} export files: {len(chosen)} unique conversations, "
+          f"{copies - len(chosen)} duplicate copies skipped\n")
+    
+    for file_idx, path in enumerate(paths):
+        for position, conversation in enumerate(iter_conversations(path)):
+            if conversation_id_of(conversation) is None or (file_idx, position) in keep_at:
+                yield conversation
+
+# === Conversation Selection ===
+def parse_time_bound(text):
+    """argparse type: a YYYY-MM-DD date or TIMESTAMP_FORMAT time (local) as epoch seconds"""
+    for fmt in ("%Y-%m-%d", TIMESTAMP_FORMAT):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD or 'YYYY-MM-DD HH:MM:SS', got {text!r}")
+
+def parse_shard(text):
+    """argparse type: "i/N", the i-th of N shards (0 <= i < N)"""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {text!r}")
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..{count - 1}, got {text!r}")
+    return index, count
+
+def selection_digest(conversation):
+    """Stable hash of a conversation's id (title and create_time without one); the same in every run and process"""
+    key = conversation_id_of(conversation)
+    if key is None:
+        key = json.dumps([conversation.get("title"), conversation.get("create_time")], default=str)
+    return hashlib.sha256(str(key).encode("utf-8")).digest()
+
+class ConversationFilter:
+    """
+    Which conversations of the input a run analyzes (--title, --id, --since,
+    --until, --model, --min-messages, --shard, --sample).
+
+    Conversations are tested as they are read, before their messages are
+    extracted. Shards and samples hash the conversation id, so they do not
+    depend on input order: the N shards of an export are disjoint and together
+    cover it, and a sample keeps the same conversations in every run.
+    """
+
+    def __init__(self, options):
+        self.title = re.compile(options.title, re.IGNORECASE) if options.title else None
+        self.ids = set(options.ids or ())
+        self.since, self.until = options.since, options.until
+        self.models = set(options.models or ())
+        self.min_messages = options.min_messages
+        self.shard = options.shard
+        self.sample = options.sample
+        self.seen = self.selected = 0
+
+    @property
+    def active(self):
+        return bool(self.title or self.ids or self.since is not None or self.until is not None or self.models
+                    or self.min_messages or self.shard or self.sample is not None)
+
+    def uses_model(self, conversation):
+        if conversation.get("default_model_slug") in self.models:
+            return True
+        for node in (conversation.get("mapping") or {}).values():
+            message = node.get("message") or {}
+            if (message.get("metadata") or {}).get("model_slug") in self.models:
+                return True
+        return False
+
+    def accepts(self, conversation):
+        if self.ids and conversation_id_of(conversation) not in self.ids:
+            return False
+        if self.title and not self.title.search(conversation.get("title") or ""):
+            return False
+        if self.since is not None or self.until is not None:
+            created = convert_timestamp(conversation.get("create_time"))
+            if np.isnan(created) or (self.since is not None and created < self.since) \
+                    or (self.until is not None and created >= self.until):
+                return False
+        if self.shard or self.sample is not None:
+            digest = selection_digest(conversation)
+            if self.shard and int.from_bytes(digest[:8], "big") % self.shard[1] != self.shard[0]:
+                return False
+            if self.sample is not None and int.from_bytes(digest[8:16], "big") / 2 ** 64 >= self.sample:
+                return False
+        if self.models and not self.uses_model(conversation):
+            return False
+        if self.min_messages:
+            tree = ConversationTree(conversation)
+            if len(tree.message_path(tree.current_path())) < self.min_messages:
+                return False
+        return True
+
+    def __call__(self, conversations):
+        """Yield the accepted conversations"""
+        for conversation in conversations:
+            self.seen += 1
+            if self.accepts(conversation):
+                self.selected += 1
+                yield conversation
+
+# === Conversation Tree Traversal ===
+def message_row(node):
+    """
+    Message row of one mapping node, or None when the node has no text
+    Word, token and sentence counts are left as None; analyze_conversation fills
+    them in from each message's MessageTokens and one count_tokens_batch call
+    """
+    message = node.get("message")
     if not message: 
-        return messages_list
+        return None
 
     role = message.get("author", {}).get("role", "unknown")
     content_data = message.get("content", {})
     content_parts = content_data.get("parts", [])
     content = extract_text_from_parts(content_parts)
+    if not content:
+        return None
     timestamp = convert_timestamp(message.get("create_time", ""))
     metadata = message.get("metadata", {})
     model_used = metadata.get("model_slug", content_data.get("model_slug", "unknown"))
 
-    if content:
-        messages_list.append({
-            "role": role, 
-            "content": content, 
-            "timestamp": timestamp,
-            "word_count": count_words(content), 
-            "token_count": count_tokens(content),
-            "sentence_count": count_sentences(content),
-            "model": model_used,
-            "parts": [p.get("text") if isinstance(p, dict) else p for p in content_parts]
-        })
+    return {
+        "role": role, 
+        "content": content, 
+        "timestamp": timestamp,
+        "word_count": None, 
+        "token_count": None,
+        "sentence_count": None,
+        "model": model_used,
+        "parts": [p.get("text") if isinstance(p, dict) else p for p in content_parts]
+    }
 
-    for child in message.get("children", []):
-        messages_list.extend(extract_messages({"message": child}))
-    
-    return messages_list
+class ConversationTree:
+    """
+    Parent/child index of one conversation's mapping, built once.
+
+    Every mapping node names its `parent` and `children`; regenerated and edited
+    turns are sibling subtrees. The conversation as last shown in ChatGPT is the
+    path from the root to `current_node`. Walks are iterative and visit each
+    node at most once, so deep threads cannot hit the recursion limit.
+    """
+
+    def __init__(self, chat):
+        self.nodes = chat.get("mapping") or {}
+        self.current_node = chat.get("current_node")
+        self.children = {}   # node id -> ids of its children present in the mapping
+        self.roots = []
+        self._rows = {}      # node id -> message_row, shared by every branch through the node
+        for node_id, node in self.nodes.items():
+            if node.get("parent") not in self.nodes:
+                self.roots.append(node_id)
+            self.children[node_id] = [child for child in node.get("children") or () if child in self.nodes]
+
+    def current_path(self):
+        """
+        Node ids from the root to `current_node`, in conversation order.
+        Without a usable `current_node` the latest branch (last child at every
+        fork) is followed; a mapping without any parent links is taken in file order.
+        """
+        if len(self.roots) == len(self.nodes):
+            return list(self.nodes)
+        if self.current_node in self.nodes:
+            path, seen = [], set()
+            node_id = self.current_node
+            while node_id in self.nodes and node_id not in seen:
+                seen.add(node_id)
+                path.append(node_id)
+                node_id = self.nodes[node_id].get("parent")
+            path.reverse()
+            return path
+        path, seen = [], set()
+        node_id = self.roots[0] if self.roots else None
+        while node_id is not None and node_id not in seen:
+            seen.add(node_id)
+            path.append(node_id)
+            children = self.children[node_id]
+            node_id = children[-1] if children else None
+        return path
+
+    def branches(self):
+        """Yield the node ids of every root-to-leaf path (one per regenerated branch), depth first"""
+        path, seen = [], set()
+        stack = [(root, 0) for root in reversed(self.roots)]
+        while stack:
+            node_id, depth = stack.pop()
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            del path[depth:]
+            path.append(node_id)
+            children = [child for child in self.children[node_id] if child not in seen]
+            if not children:
+                yield list(path)
+            stack.extend((child, depth + 1) for child in reversed(children))
+
+    def row(self, node_id):
+        """Message row of a node (None without text); branches through the node share the same dict"""
+        if node_id not in self._rows:
+            self._rows[node_id] = message_row(self.nodes[node_id])
+        return self._rows[node_id]
+
+    def message_path(self, path):
+        """The node ids of a path that carry a message"""
+        return [node_id for node_id in path if self.row(node_id) is not None]
+
+    def rows(self, path):
+        """Message rows along a path of node ids, skipping nodes without text"""
+        return [self.row(node_id) for node_id in self.message_path(path)]
+
+def extract_messages(chat, all_branches=False):
+    """
+    Message rows of one conversation in conversation order: the branch ending at
+    `current_node`, or a list with the rows of every branch when `all_branches`
+    """
+    tree = ConversationTree(chat)
+    if all_branches:
+        return [tree.rows(path) for path in tree.branches()]
+    return tree.rows(tree.current_path())
 
 # === Enhanced Turn-Taking Analysis ===
-def compute_turntaking_metrics(messages):
-    """Compute response times and turn-taking patterns"""
-    prev_time = None
-    prev_role = None
-    turn_lengths = []
-    
-    for m in messages:
-        timestamp = m.get("timestamp")
-        current_role = m.get("role")
-        
-        try: 
-            dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S") if timestamp else None
-        except: 
-            dt = None
-        
-        # Calculate response time
-        if dt and prev_time:
-            response_time = (dt - prev_time).total_seconds()
-            m['response_time'] = response_time
-            
-            # Track turn-taking patterns
-            if prev_role and prev_role != current_role:
-                turn_lengths.append(response_time)
-        else:
-            m['response_time'] = None
-        
-        prev_time = dt or prev_time
-        prev_role = current_role
+def compute_turntaking_metrics(messages, state=None):
+    """
+    Compute response times: seconds since the latest earlier message with a timestamp
+    `state` carries that timestamp and the last role across calls (incremental mode)
+    """
+    state = {} if state is None else state
+    if not messages:
+        return messages
+    times = np.array([m["timestamp"] for m in messages], dtype=np.float64)
+    prev_time = state.get("prev_time")
+    # Forward-fill known timestamps, seeded with the one carried over, and diff
+    latest = pd.Series(np.concatenate(([np.nan if prev_time is None else prev_time], times))).ffill().to_numpy()
+    response_times = times - latest[:-1]
+    for m, response_time in zip(messages, response_times.tolist()):
+        m['response_time'] = None if np.isnan(response_time) else response_time
     
+    state["prev_time"] = None if np.isnan(latest[-1]) else float(latest[-1])
+    state["prev_role"] = messages[-1].get("role")
     return messages
 
 # === Enhanced Dialogue Act Classification ===
@@ -723,101 +1865,250 @@ def classify_dialogue_acts(messages):
     
     return messages
 
+# Every label classify_dialogue_acts assigns, sorted. Acts are integer-coded by
+# their position here, so transition matrices are plain square arrays.
+DIALOGUE_ACTS = sorted(
+    {"question", "gratitude", "agreement", "disagreement", "clarification", "answer", "statement"}
+    | {f"question_{qtype}" for qtype in [*QUESTION_TYPES, "information-seeking", "causal", "procedural", "other"]})
+ACT_CODES = {act: code for code, act in enumerate(DIALOGUE_ACTS)}
+
+def act_transition_counts(acts):
+    """Transition counts between consecutive dialogue acts (from act rows, to act columns of DIALOGUE_ACTS)"""
+    n_acts = len(DIALOGUE_ACTS)
+    codes = np.array([ACT_CODES[act] for act in acts], dtype=np.intp)
+    pairs = codes[:-1] * n_acts + codes[1:]
+    return np.bincount(pairs, minlength=n_acts * n_acts).reshape(n_acts, n_acts)
+
 # === Turn Pair Analysis ===
-def analyze_turn_pairs(df):
-    """Analyze user-assistant turn pairs for patterns"""
+def analyze_turn_pairs(df, start=0):
+    """
+    Analyze user-assistant turn pairs for patterns (pairs beginning at `start` or later)
+    Each message is compared with the next through columns shifted by one row
+    """
+    roles = df['role'].to_numpy()
+    contents = df['content'].tolist()
+    word_counts = df['word_count'].to_numpy()
+    response_times = df['response_time'].to_numpy() if 'response_time' in df.columns else np.full(len(df), None)
+    
+    is_pair = (roles[:-1] == 'user') & (roles[1:] == 'assistant')
+    is_pair[:start] = False
+    pair_idx = np.flatnonzero(is_pair)
+    if not len(pair_idx):
+        return []
+    
+    # Response length ratio (numpy rounding, as on the int64 columns before)
+    user_lengths, assistant_lengths = word_counts[pair_idx], word_counts[pair_idx + 1]
+    ratios = np.round(np.divide(assistant_lengths, user_lengths, out=np.zeros(len(pair_idx)),
+                                where=user_lengths > 0), 2)
+    
+    # Semantic similarity (using simple overlap for efficiency), each message split once
+    word_sets = {i: set(contents[i].lower().split()) - stopwords for i in np.union1d(pair_idx, pair_idx + 1)}
+    
     pairs = []
+    for i, user_length, assistant_length, ratio in zip(pair_idx.tolist(), user_lengths.tolist(),
+                                                        assistant_lengths.tolist(), ratios.tolist()):
+        user_words, assistant_words = word_sets[i], word_sets[i + 1]
+        overlap = len(user_words & assistant_words) / len(user_words | assistant_words) if user_words or assistant_words else 0
+        pairs.append({
+            'pair_index': i,
+            'user_length': user_length,
+            'assistant_length': assistant_length,
+            'response_ratio': ratio if user_length > 0 else 0,
+            'semantic_overlap': round(overlap, 3),
+            'question_type': classify_question_type(contents[i]) if contents[i].endswith('?') else None,
+            'response_time': response_times[i + 1]
+        })
     
-    for i in range(len(df) - 1):
-        current = df.iloc[i]
-        next_msg = df.iloc[i + 1]
-        
-        if current['role'] == 'user' and next_msg['role'] == 'assistant':
-            # Calculate engagement metrics for this pair
-            user_question_type = classify_question_type(current['content']) if current['content'].endswith('?') else None
-            
-            # Response length ratio
-            response_ratio = next_msg['word_count'] / current['word_count'] if current['word_count'] > 0 else 0
+    return pairs
+
+# === Convergence Detection ===
+# Running sums are kept exactly as integer multiples of 2**-1074 (the smallest float
+# step), so adding and removing values never drifts and averages are correctly rounded
+_EXACT_ONE = 1 << 1074
+
+def _exact(value):
+    numerator, denominator = value.as_integer_ratio()
+    return numerator * (_EXACT_ONE // denominator)
+
+class RollingWindow:
+    """
+    Running count, exact sum and Welford variance over the last `size` values pushed.
+    NaN values occupy a slot but are skipped by the statistics, as with dropna().
+    """
+    __slots__ = ('size', 'values', 'count', 'exact_total', 'mean', 'm2')
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.count = 0
+        self.exact_total = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, value):
+        """Add a value, dropping the oldest one once the window is full"""
+        value = float(value)
+        self.values.append(value)
+        if value == value:
+            self.count += 1
+            self.exact_total += _exact(value)
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        if len(self.values) > self.size:
+            old = self.values.popleft()
+            if old == old:
+                self.count -= 1
+                self.exact_total -= _exact(old)
+                if self.count:
+                    delta = old - self.mean
+                    self.mean -= delta / self.count
+                    self.m2 = max(self.m2 - delta * (old - self.mean), 0.0)
+                else:
+                    self.mean = self.m2 = 0.0
+
+    def total(self):
+        return self.exact_total / _EXACT_ONE
+
+    def average(self):
+        return self.total() / self.count if self.count else np.nan
+
+    def variance(self):
+        """Sample variance (ddof=1), NaN with fewer than two values"""
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+def detect_convergence_windows(df, window_sizes=(10,), start=0):
+    """
+    Convergence records of detect_convergence_patterns for several window sizes in one pass.
+    Returns {window_size: records}; only windows ending at message `start` or later are kept.
+    """
+    n = len(df)
+    columns = {'Contradictions': df['Contradictions'], 'Elaborations': df['Elaborations'],
+               'response_time': df['response_time'], 'sentiment_score': df['sentiment_score']}
+    for optional in ('Cognitive_Load_Density', 'Total_Repair_Markers'):
+        if optional in df.columns:
+            columns[optional] = df[optional]
+    values = {name: column.to_numpy(dtype=np.float64) for name, column in columns.items()}
+    
+    # Previous-window contradiction means use the original slices, negative starts included
+    contradiction_prefix = np.concatenate(([0.0], np.cumsum(values['Contradictions'])))
+    
+    def previous_contradictions(i, window_size):
+        lo, hi, _ = slice(i - window_size - 10, i - window_size).indices(n)
+        return (contradiction_prefix[hi] - contradiction_prefix[lo]) / (hi - lo) if hi > lo else np.nan
+    
+    windows = {w: {name: RollingWindow(w) for name in values} for w in window_sizes}
+    records = {w: [] for w in window_sizes}
+    for row in range(n - 1):
+        i = row + 1
+        for window_size, stats in windows.items():
+            for name, window in stats.items():
+                window.push(values[name][row])
+            if i < max(window_size, start):
+                continue
             
-            # Semantic similarity (using simple overlap for efficiency)
-            user_words = set(current['content'].lower().split()) - stopwords
-            assistant_words = set(next_msg['content'].lower().split()) - stopwords
-            overlap = len(user_words & assistant_words) / len(user_words | assistant_words) if user_words or assistant_words else 0
+            # Calculate metrics for this window (rows i-window_size .. i-1)
+            avg_contradictions = stats['Contradictions'].average()
+            avg_response_time = stats['response_time'].average()
+            sentiment_variance = stats['sentiment_score'].variance()
+            cog_load_trend = stats['Cognitive_Load_Density'].average() if 'Cognitive_Load_Density' in stats else None
+            repair_freq = stats['Total_Repair_Markers'].total() if 'Total_Repair_Markers' in stats else None
             
-            pairs.append({
-                'pair_index': i,
-                'user_length': current['word_count'],
-                'assistant_length': next_msg['word_count'],
-                'response_ratio': round(response_ratio, 2),
-                'semantic_overlap': round(overlap, 3),
-                'question_type': user_question_type,
-                'response_time': next_msg.get('response_time')
+            records[window_size].append({
+                'message_index': i,
+                'avg_contradictions_window': np.round(avg_contradictions, 2),
+                'avg_elaborations_window': np.round(stats['Elaborations'].average(), 2),
+                'contradiction_trend': 'decreasing' if i > window_size and avg_contradictions < previous_contradictions(i, window_size) else 'stable',
+                'avg_response_time_window': np.round(avg_response_time, 1) if pd.notna(avg_response_time) else None,
+                'sentiment_stability': np.round(1 - sentiment_variance, 3) if pd.notna(sentiment_variance) else None,
+                'cognitive_load_window': np.round(cog_load_trend, 2) if cog_load_trend else None,
+                'repair_frequency_window': int(repair_freq) if repair_freq else None
             })
     
-    return pairs
+    return records
 
-# === Convergence Detection ===
-def detect_convergence_patterns(df, window_size=10):
+def detect_convergence_patterns(df, window_size=10, start=0):
     """
     Detect convergence patterns in dialogue
     Looks for decreasing contradiction rates and increasing coherence
+    Only windows ending at message `start` or later are computed
     """
-    convergence_metrics = []
-    
-    for i in range(window_size, len(df)):
-        window = df.iloc[i-window_size:i]
-        
-        # Calculate metrics for this window
-        avg_contradictions = window['Contradictions'].mean()
-        avg_elaborations = window['Elaborations'].mean()
-        avg_response_time = window['response_time'].dropna().mean()
-        sentiment_variance = window['sentiment_score'].var()
-        
-        # NEW: Check for cognitive load trends
-        if 'Cognitive_Load_Density' in window.columns:
-            cog_load_trend = window['Cognitive_Load_Density'].mean()
-        else:
-            cog_load_trend = None
-        
-        # NEW: Check for repair frequency
-        if 'Total_Repair_Markers' in window.columns:
-            repair_freq = window['Total_Repair_Markers'].sum()
-        else:
-            repair_freq = None
-        
-        convergence_metrics.append({
-            'message_index': i,
-            'avg_contradictions_window': round(avg_contradictions, 2),
-            'avg_elaborations_window': round(avg_elaborations, 2),
-            'contradiction_trend': 'decreasing' if i > window_size and avg_contradictions < df.iloc[i-window_size-10:i-window_size]['Contradictions'].mean() else 'stable',
-            'avg_response_time_window': round(avg_response_time, 1) if pd.notna(avg_response_time) else None,
-            'sentiment_stability': round(1 - sentiment_variance, 3) if pd.notna(sentiment_variance) else None,
-            'cognitive_load_window': round(cog_load_trend, 2) if cog_load_trend else None,
-            'repair_frequency_window': int(repair_freq) if repair_freq else None
-        })
-    
-    return convergence_metrics
+    return detect_convergence_windows(df, (window_size,), start)[window_size]
 
 # === BLEU/METEOR/ROUGE (maintaining original) ===
+class CachedStemmer:
+    """Porter stemmer whose stems are remembered for the whole run"""
+
+    def __init__(self, stemmer):
+        self.stem = lru_cache(maxsize=mt_memo_size)(stemmer.stem)
+
+class CachedWordNet:
+    """WordNet reader whose synset lookups are remembered for the whole run"""
+
+    def __init__(self, reader):
+        self._reader = reader
+        self.synsets = lru_cache(maxsize=mt_memo_size)(lambda word: reader.synsets(word))
+
+    def __getattr__(self, name):
+        return getattr(self._reader, name)
+
+class MemoRougeTokenizer:
+    """
+    rouge_score's default tokenizer (lower-case, alphanumeric, Porter stems)
+    that tokenizes each text once per batch of pairs
+    """
+
+    def __init__(self, stemmer):
+        self.stemmer = stemmer
+        self.memo = {}
+
+    def tokenize(self, text):
+        tokens = self.memo.get(text)
+        if tokens is None:
+            tokens = self.memo[text] = rouge_tokenize.tokenize(text, self.stemmer)
+        return tokens
+
 smoothie = SmoothingFunction().method1
-rouge = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], use_stemmer=True)
+mt_stemmer = CachedStemmer(PorterStemmer())
+mt_wordnet = CachedWordNet(wordnet)
+rouge_tokenizer = MemoRougeTokenizer(mt_stemmer)
+rouge = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], tokenizer=rouge_tokenizer)
 
 def compute_bleu(ref, cand):
-    r, c = ref.split(), cand.split()
+    r, c = as_message_tokens(ref).words, as_message_tokens(cand).words
     return sentence_bleu([r], c, smoothing_function=smoothie) if r and c else 0
 
 def compute_meteor(ref, cand):
-    r, c = ref.split(), cand.split()
-    return meteor_score([r], c) if r and c else 0
+    r, c = as_message_tokens(ref).words, as_message_tokens(cand).words
+    return meteor_score([r], c, stemmer=mt_stemmer, wordnet=mt_wordnet) if r and c else 0
 
 def compute_rouge(ref, cand):
-    scores = rouge.score(ref, cand)
+    scores = rouge.score(as_text(ref), as_text(cand))
     return {k: v.fmeasure for k, v in scores.items()}
 
+def compute_mt_metrics(pairs):
+    """
+    BLEU, METEOR and ROUGE of every (reference, candidate) message pair of a thread
+    Each message is ROUGE-tokenized once even when it appears in two pairs
+    """
+    results = []
+    try:
+        for ref, cand in pairs:
+            rouge_scores = compute_rouge(ref, cand)
+            results.append({
+                'bleu': compute_bleu(ref, cand),
+                'meteor': compute_meteor(ref, cand),
+                'rouge1': rouge_scores.get("rouge1", 0),
+                'rougeL': rouge_scores.get("rougeL", 0)
+            })
+    finally:
+        rouge_tokenizer.memo.clear()
+    return results
+
 # === Enhanced Language Metrics ===
 def compute_entropy(text):
     """Shannon entropy of text"""
-    tokens = text.split()
+    tokens = as_message_tokens(text).words
     if not tokens:
         return 0
     freq = Counter(tokens)
@@ -826,21 +2117,26 @@ def compute_entropy(text):
 
 def lexical_diversity(text):
     """Type-token ratio (lexical diversity)"""
-    words = re.findall(r'\b\w+\b', text.lower())
+    words = as_message_tokens(text).word_tokens
     return len(set(words)) / len(words) if words else 0
 
-def compute_readability(text):
-    """Enhanced Flesch Reading Ease with better syllable counting"""
-    sentences = count_sentences(text)
+def compute_readability(text, syllable_count=None):
+    """
+    Enhanced Flesch Reading Ease with better syllable counting
+    `syllable_count` may be passed in from count_thread_syllables
+    """
+    tokens = as_message_tokens(text)
+    sentences = tokens.sentence_count
     if sentences == 0:
         return 0
     
-    words = text.split()
+    words = tokens.words
     word_count = len(words)
     if word_count == 0:
         return 0
     
-    syllable_count = sum(count_syllables(word) for word in words)
+    if syllable_count is None:
+        syllable_count = sum(count_syllables(word) for word in words)
     
     # Flesch Reading Ease formula
     fre = 206.835 - (1.015 * (word_count / sentences)) - (84.6 * (syllable_count / word_count))
@@ -853,7 +2149,7 @@ def compute_lexical_richness(text):
     - MTLD: Measure of Textual Lexical Diversity (approximation)
     - Unique words per 100 words
     """
-    words = re.findall(r'\b\w+\b', text.lower())
+    words = as_message_tokens(text).word_tokens
     if not words:
         return {'ttr': 0, 'unique_per_100': 0}
     
@@ -867,25 +2163,30 @@ def compute_lexical_richness(text):
     }
 
 # === Keyword Flow Analysis ===
-def compute_keyword_flow(df):
-    """Track keyword continuity across messages"""
-    flow_edges = 0
-    total_words = set()
-    keyword_persistence = []
+def keyword_sets(texts):
+    """Content words of each message (word tokens minus stopwords), tokenized once per message"""
+    return pd.Series([as_message_tokens(text).keywords for text in texts], dtype=object)
+
+def compute_keyword_flow(df, keywords=None):
+    """
+    Track keyword continuity across messages
+    Compares each message's keyword set with the previous row's (shifted column)
+    """
+    if keywords is None:
+        keywords = keyword_sets(df['content'])
+    previous = keywords.shift(1).iloc[1:]
+    current = keywords.iloc[1:]
     
-    for i in range(1, len(df)):
-        prev_words = set(re.findall(r'\b\w+\b', df.iloc[i-1]['content'].lower())) - stopwords
-        curr_words = set(re.findall(r'\b\w+\b', df.iloc[i]['content'].lower())) - stopwords
-        
-        # Count shared keywords
-        shared = prev_words & curr_words
-        flow_edges += len(shared)
+    # Count shared keywords
+    shared_counts = [len(prev_words & curr_words) for prev_words, curr_words in zip(previous, current)]
+    flow_edges = sum(shared_counts)
+    total_words = set()
+    for curr_words in current:
         total_words.update(curr_words)
-        
-        # Track persistence
-        if prev_words:
-            persistence = len(shared) / len(prev_words)
-            keyword_persistence.append(persistence)
+    
+    # Track persistence
+    keyword_persistence = [shared / len(prev_words)
+                           for shared, prev_words in zip(shared_counts, previous) if prev_words]
     
     # Get top keywords
     top_keywords = list(islice(total_words, 15))
@@ -906,9 +2207,34 @@ def compute_sentiment_shift(sentiments):
     diffs = [abs(nums[i] - nums[i-1]) for i in range(1, len(nums))]
     return round(sum(diffs) / len(diffs), 3) if diffs else 0
 
-def detect_response_edits(messages):
-    """Detect edits and revisions in messages"""
-    prev_assistant = None
+EDIT_SIMILARITY_THRESHOLD = 0.9   # consecutive assistant messages less similar than this count as an edit
+
+def edit_similarity_ratio(a, b, threshold=None):
+    """
+    SequenceMatcher ratio of two texts.
+    With a threshold, the cheap upper bounds real_quick_ratio (lengths only) and
+    quick_ratio (character multisets) are tried first; when one already falls
+    below the threshold it is returned as the estimate, and the quadratic exact
+    ratio only runs for pairs that may reach the threshold.
+    """
+    matcher = SequenceMatcher(None, a, b)
+    if threshold is not None:
+        for bound in (matcher.real_quick_ratio, matcher.quick_ratio):
+            estimate = bound()
+            if estimate < threshold:
+                return estimate
+    return matcher.ratio()
+
+def detect_response_edits(messages, state=None, tiered=False):
+    """
+    Detect edits and revisions in messages
+    `state` carries the last assistant message across calls (incremental mode)
+    With `tiered`, consecutive assistant messages that are clearly below the edit
+    threshold get an upper-bound similarity instead of the exact ratio; edit
+    counts are the same either way.
+    """
+    state = {} if state is None else state
+    prev_assistant = state.get("prev_assistant")
     
     for m in messages:
         text = m.get("content", "")
@@ -925,8 +2251,9 @@ def detect_response_edits(messages):
         
         # Check for similar consecutive assistant messages (iterations)
         elif role == "assistant" and prev_assistant:
-            edit_similarity = SequenceMatcher(None, prev_assistant, text).ratio()
-            if edit_similarity < 0.9:
+            edit_similarity = edit_similarity_ratio(prev_assistant, text,
+                                                    EDIT_SIMILARITY_THRESHOLD if tiered else None)
+            if edit_similarity < EDIT_SIMILARITY_THRESHOLD:
                 edit_count = 1
         
         if role == "assistant":
@@ -937,636 +2264,824 @@ def detect_response_edits(messages):
             "edit_similarity": round(edit_similarity, 3) if edit_similarity else None
         })
     
+    state["prev_assistant"] = prev_assistant
     return messages
 
-# === MAIN PROCESSING ===
-print("=" * 80)
-print("ChatGPT-DialogueMetrics v3.2")
-print("SPDX-License-Identifier: LicenseRef-RCNM-1.0")  
-print("Version: 1.0")
-print("Status: Custom Research License")
-print("Author: R.Rex (Collaborated with ChatGPT, Claude, Kimi, Deepseek, & Gemini)")
-print("Year: 2026")  
-print("=" * 80)
-print(f"\nLoading: {input_file}")
-
-with open(input_file, "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-all_chats = {}
-summary_rows = []
-process_notes = []
-
-# Structures for matrix analysis
-global_act_counts = defaultdict(lambda: defaultdict(int))          # global transition counts
-all_messages_list = []                                             # for global correlation
-
-# Per-thread matrix storage
-thread_act_counts = {}      # dict: thread_name -> defaultdict of transition counts
-thread_numeric_data = {}    # dict: thread_name -> DataFrame of numeric columns (for correlation)
-
-print(f"Found {len(data)} conversation(s) to analyze...\n")
-
-# === Create two Excel writers ===
-with pd.ExcelWriter(main_output_file, engine="xlsxwriter") as main_writer, \
-     pd.ExcelWriter(matrix_output_file, engine="xlsxwriter") as matrix_writer:
-
-    workbook_main = main_writer.book
-    workbook_matrix = matrix_writer.book
-
-    # Formats for main output
-    header_fmt_main = workbook_main.add_format({
-        'bold': True, 
-        'bg_color': '#4A90E2',
-        'font_color': 'white',
-        'align': 'center', 
-        'valign': 'vcenter',
-        'border': 1
-    })
-    center_fmt_main = workbook_main.add_format({'align': 'center', 'valign': 'vcenter'})
-    number_fmt_main = workbook_main.add_format({'num_format': '0.00', 'align': 'center'})
+# =============================================================================
+# PROFILING
+# =============================================================================
+def profiling_enabled(options):
+    return bool(options.profile or options.performance_sheet)
 
-    # Formats for matrix output
-    header_fmt_matrix = workbook_matrix.add_format({
-        'bold': True, 
-        'bg_color': '#4A90E2',
-        'font_color': 'white',
-        'align': 'center', 
-        'valign': 'vcenter',
-        'border': 1
-    })
-    center_fmt_matrix = workbook_matrix.add_format({'align': 'center', 'valign': 'vcenter'})
-    number_fmt_matrix = workbook_matrix.add_format({'num_format': '0.00', 'align': 'center'})
+def peak_rss_mb(children=False):
+    """Peak resident memory of this process (or of its finished workers) in MB, None where unknown"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
 
-    for chat_idx, chat in enumerate(data, 1):
-        title = chat.get("title", "Untitled Chat")
-        safe_title = re.sub(r'[\\/*?:[\]]', '_', title)[:31]
-        
-        print(f"[{chat_idx}/{len(data)}] Processing: {title}")
-        
-        rows = []
-        timestamps = []
-        
-        # Extract messages
-        for mapping in chat.get("mapping", {}).values():
-            extracted = extract_messages(mapping)
-            rows.extend(extracted)
-            timestamps.extend([r["timestamp"] for r in extracted if r["timestamp"]])
+class StageTimer:
+    """
+    Wall-clock seconds spent in each named stage.
+
+    lap(stage) charges the time since the previous lap to `stage`, so stages
+    can be marked in straight-line code. A disabled timer does nothing.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = {}   # stage -> seconds, in first-lap order
+        self._last = time.perf_counter() if enabled else None
+
+    def lap(self, stage):
+        if self.enabled:
+            now = time.perf_counter()
+            self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+            self._last = now
+
+LOOKUP_COUNTERS = ["syllable_memo", "token_memo", "metric_cache"]   # <name>_hits/<name>_misses in a thread profile
+
+def hit_rate(counts, counter):
+    """Share of `counter` lookups that hit, from its <counter>_hits/<counter>_misses (None without lookups)"""
+    hits, misses = counts[f"{counter}_hits"], counts[f"{counter}_misses"]
+    return round(hits / (hits + misses), 3) if hits + misses else None
+
+class RunProfile:
+    """
+    Per-thread stage timings and counters of a run (as returned by
+    analyze_conversation, plus the parent's output stages) and run totals
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.threads = []
+        self.run_stages = {}   # stage -> seconds spent once per run, after the threads
+        self.lookups = {}      # "<counter>_hits"/"<counter>_misses" -> run total
+
+    def add_thread(self, result, output_stages):
+        """Record one analyzed thread; `output_stages` are the parent's timings for it"""
+        profile = result["profile"]
+        analysis_seconds = sum(profile["stages"].values())
+        looked_up = profile["messages"] - profile["resumed"]
+        row = {
+            "thread": result["chat_idx"],
+            "title": result["title"],
+            "messages": profile["messages"],
+            "computed": profile["computed"],
+            "resumed": profile["resumed"],
+            "row_cache_hit_rate": round(profile["row_cache_hits"] / looked_up, 3) if looked_up else None,
+            "syllable_memo_hit_rate": hit_rate(profile, "syllable_memo"),
+            "token_memo_hit_rate": hit_rate(profile, "token_memo"),
+            "metric_cache_hit_rate": hit_rate(profile, "metric_cache"),
+            "analysis_seconds": round(analysis_seconds, 6),
+            "messages_per_second": round(profile["messages"] / analysis_seconds, 1) if analysis_seconds else None,
+            "peak_rss_mb": profile["peak_rss_mb"]
+        }
+        for stage, seconds in chain(profile["stages"].items(), output_stages.items()):
+            row[stage] = round(row.get(stage, 0.0) + seconds, 6)
+        self.threads.append(row)
+        for counter in LOOKUP_COUNTERS:
+            for outcome in ("hits", "misses"):
+                key = f"{counter}_{outcome}"
+                self.lookups[key] = self.lookups.get(key, 0) + profile[key]
+
+    def totals(self):
+        """Run-wide figures: wall time, throughput, peak memory and seconds per stage"""
+        wall_seconds = time.perf_counter() - self.started
+        messages = sum(row["messages"] for row in self.threads)
+        peaks = [mb for mb in (peak_rss_mb(), peak_rss_mb(children=True)) if mb is not None]
+        stages = {}
+        for row in self.threads:
+            for stage in row:
+                if stage not in THREAD_PROFILE_FIELDS:
+                    stages[stage] = stages.get(stage, 0.0) + row[stage]
+        for stage, seconds in self.run_stages.items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+        return {
+            "threads": len(self.threads),
+            "messages": messages,
+            "wall_seconds": round(wall_seconds, 3),
+            "messages_per_second": round(messages / wall_seconds, 1) if wall_seconds else None,
+            "peak_rss_mb": max(peaks) if peaks else None,
+            "hit_rates": {f"{counter}_hit_rate": hit_rate(self.lookups, counter) for counter in LOOKUP_COUNTERS},
+            "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()}
+        }
+
+    def frame(self):
+        """One row per thread, after a first row of run totals (thread "all")"""
+        totals = self.totals()
+        total_row = {"thread": "all", "title": "", "messages": totals["messages"],
+                     "computed": sum(row["computed"] for row in self.threads),
+                     "resumed": sum(row["resumed"] for row in self.threads),
+                     "analysis_seconds": totals["wall_seconds"],
+                     "messages_per_second": totals["messages_per_second"],
+                     "peak_rss_mb": totals["peak_rss_mb"], **totals["hit_rates"], **totals["stages"]}
+        df = pd.DataFrame([total_row] + self.threads)
+        stage_columns = [column for column in df.columns if column not in THREAD_PROFILE_FIELDS]
+        df[stage_columns] = df[stage_columns].fillna(0.0)
+        return df[THREAD_PROFILE_FIELDS + stage_columns]
+
+    def write(self, path):
+        """Write the profile as CSV (one row per thread) or JSON (run totals plus threads)"""
+        if path.lower().endswith(".csv"):
+            self.frame().to_csv(path, index=False)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"run": self.totals(), "threads": self.threads}, f, indent=2)
+
+# Non-stage columns of a RunProfile thread row
+THREAD_PROFILE_FIELDS = ["thread", "title", "messages", "computed", "resumed", "row_cache_hit_rate",
+                         "syllable_memo_hit_rate", "token_memo_hit_rate", "metric_cache_hit_rate",
+                         "analysis_seconds", "messages_per_second", "peak_rss_mb"]
+
+def write_performance_sheet(workbook, profile, header_fmt, center_fmt):
+    """Write the run profile to the Performance sheet of the main workbook"""
+    df = profile.frame()
+    ws = workbook.add_worksheet("Performance")
+    ws.freeze_panes(1, 2)
+    ws.set_row(0, None, header_fmt)
+    ws.set_column(0, 0, 10, center_fmt)
+    ws.set_column(1, 1, 40)
+    ws.set_column(2, len(df.columns) - 1, 16, center_fmt)
+    write_frame(ws, df)
+
+# =============================================================================
+# PER-THREAD ANALYSIS
+# =============================================================================
+# History-dependent message fields saved per thread for --incremental runs
+THREAD_STATE_FIELDS = ["response_time", "dialogue_act", "edit_count", "edit_similarity"]
+
+def tokenize_messages(rows, cache=None):
+    """
+    MessageTokens of every message, tokenized once; fills in the word, token and
+    sentence counts of the rows (token counts in one count_tokens_batch call)
+    """
+    message_tokens = [MessageTokens(m["content"]) for m in rows]
+    token_counts = count_tokens_batch([m["content"] for m in rows], cache)
+    for m, tokens, token_count in zip(rows, message_tokens, token_counts):
+        m["word_count"] = len(tokens.words)
+        m["token_count"] = token_count
+        m["sentence_count"] = tokens.sentence_count
+    return message_tokens
+
+def analyze_thread(safe_title, rows, message_tokens, options, cache=None, resume=None, timer=None):
+    """
+    Per-message and thread-level metrics of one sequence of messages: a
+    conversation, or one branch of it.
+
+    `resume` is the saved state of a prefix of `rows` that was analyzed before
+    (by an --incremental run, or as part of another branch); only the messages
+    after it are computed. Returns the DataFrame, summary row and matrix data
+    along with the state a later resume needs.
+    """
+    vectorized = options.pattern_engine == "vectorized"
+    timer = timer or StageTimer(False)
+    n_resumed = resume["count"] if resume else 0
+    trailing = dict(resume["trailing"]) if resume else {}
+    if resume:
+        for m, derived in zip(rows, resume["derived"]):
+            m.update(zip(THREAD_STATE_FIELDS, derived))
+    
+    # Compute dialogue metrics
+    new_rows = rows[n_resumed:]
+    compute_turntaking_metrics(new_rows, trailing)
+    classify_dialogue_acts(new_rows)
+    detect_response_edits(new_rows, trailing, tiered=options.edit_similarity == "tiered")
+    
+    conversation_duration = compute_duration(np.array([m["timestamp"] for m in rows], dtype=np.float64))
+    timer.lap("dialogue")
+    
+    # Create DataFrame
+    df = pd.DataFrame(rows)
+    
+    # Add sequence numbers
+    df.insert(0, 'Seq. #', [f"#{i+1}" for i in range(len(df))])
+    
+    # Preallocated columns for every per-message metric
+    registry = MESSAGE_METRICS
+    if options.skip_mt_metrics:
+        registry = {source: fields for source, fields in MESSAGE_METRICS.items() if source != 'mt'}
+    metrics = MetricColumns(len(df), registry)
+    
+    # Initialize previous turn variables
+    prev_text = ""
+    prev_readability = 0.0
+    timer.lap("dataframe")
+    
+    # Reuse metrics of messages seen in earlier runs: a row depends only on its
+    # role, its content and the previous message's content
+    contents = df["content"].tolist()
+    cached_rows = dict(enumerate(resume["metrics"])) if resume else {}
+    if cache is not None:
+        row_kind = "row-no-mt" if options.skip_mt_metrics else "row"
+        row_keys = [cache.key(row_kind, role, prev, text)
+                    for role, prev, text in zip(df["role"], [""] + contents[:-1], contents)]
+        found = cache.get_many(row_keys[n_resumed:])
+        cached_rows.update((i, found[key]) for i, key in enumerate(row_keys) if key in found)
+    for i, values in cached_rows.items():
+        metrics.write_row(i, values)
+    to_compute = [i for i in range(len(df)) if i not in cached_rows]
+    timer.lap("cache_lookup")
+    syllable_counts = dict(zip(to_compute, count_thread_syllables([message_tokens[i] for i in to_compute])))
+    timer.lap("syllables")
+    sentiment_scores = dict(zip(to_compute, get_sentiment_backend(options.sentiment_backend).score_batch(
+        [message_tokens[i].text for i in to_compute])))
+    timer.lap("sentiment")
+    
+    print(f"  📊 Computing {len(to_compute)} message metrics...")
+    
+    # Vectorized engine: every pattern family for the whole thread in one call each
+    if vectorized and to_compute:
+        for source, values in compute_pattern_columns([contents[i] for i in to_compute]).items():
+            metrics.write_columns(source, values, to_compute)
+        timer.lap("lexicon_scan")
+    
+    # Compute per-message metrics
+    for i, row in df.iterrows():
+        text = message_tokens[i]
+        role = row["role"]
         
-        if not rows:
-            print(f"  ⚠️  No messages found, skipping...\n")
+        if i in cached_rows:
+            prev_text = text
+            prev_readability = float(metrics.arrays['Readability'][i])
             continue
         
-        # Compute dialogue metrics
-        rows = compute_turntaking_metrics(rows)
-        rows = classify_dialogue_acts(rows)
-        rows = detect_response_edits(rows)
-        
-        conversation_duration = compute_duration(timestamps)
-        all_chats[safe_title] = {"rows": rows, "duration": conversation_duration}
-        
-        # Create DataFrame
-        df = pd.DataFrame(rows)
-        
-        # Add sequence numbers
-        df.insert(0, 'Seq. #', [f"#{i+1}" for i in range(len(df))])
-        
-        # Compute sentiment with scores
-        sentiment_data = [compute_sentiment(row["content"]) for _, row in df.iterrows()]
-        df['sentiment'] = [s['label'] for s in sentiment_data]
-        df['sentiment_score'] = [s['score'] for s in sentiment_data]
-        df['subjectivity'] = [s['subjectivity'] for s in sentiment_data]
-        
-        # Initialize lists for metrics
-        bleu_scores = []
-        meteor_scores = []
-        rouge1_scores = []
-        rougeL_scores = []
-        entropy_scores = []
-        readability_scores = []
-        lexdiv_scores = []
-        
-        # Structural metrics (enhanced)
-        contradictions = []
-        elaborations = []
-        contradiction_ratios = []
-        negations = []
-        adversatives = []
-        hedges_list = []
-        confidence_list = []
-        epistemic_stance_list = []
-        
-        # =============================================================================
-        # NEW METRICS INITIALIZATION
-        # =============================================================================
-        
-        # Cognitive Load
-        cog_load_totals = []
-        cog_load_densities = []
-        complex_connectors = []
-        abstraction_markers = []
-        metacognitive_markers = []
-        computational_markers = []
-        conditional_complexity = []
-        
-        # Coherence Chains
-        reference_densities = []
-        anaphoric_refs = []
-        demonstrative_refs = []
-        comparative_refs = []
-        continuity_markers = []
-        entity_continuities = []
-        
-        # Affective Trajectory
-        dominant_affects = []
-        affective_intensities = []
-        affective_diversities = []
-        curiosity_scores = []
-        confusion_scores = []
-        satisfaction_scores = []
-        frustration_scores = []
-        surprise_scores = []
-        engagement_scores = []
-        
-        # Repair Patterns
-        total_repairs = []
-        repair_types = []
-        self_corrections = []
-        clarification_requests = []
-        confirmation_checks = []
-        elaboration_requests_list = []
-        repetitions = []
-        
-        # Knowledge Construction
-        knowledge_scores = []
-        construction_phases = []
-        joint_attention = []
-        hypothesis_markers = []
-        evidence_markers_list = []
-        synthesis_markers = []
-        perspective_markers = []
-        
-        # Social Presence
-        social_scores = []
-        rapport_indices = []
-        acknowledgments = []
-        encouragements = []
-        empathy_markers_list = []
-        solidarity_markers = []
-        politeness_markers_list = []
-        humor_markers = []
-        
-        # Argumentation
-        argument_structures = []
-        argument_qualities = []
-        claim_markers = []
-        evidence_markers_arg = []
-        warrant_markers = []
-        qualifier_markers = []
-        rebuttal_markers = []
-        
-        # Temporal Dynamics
-        temporal_orientations = []
-        urgency_levels = []
-        urgency_markers = []
-        reflection_markers = []
-        projection_markers = []
-        pace_markers = []
-        
-        # === NEW v3.2: Initialize trackers for cognitive coupling metrics ===
-        iei_list = []
-        mirroring_list = []
-        asymmetry_list = []
-        refusals_list = []
-        # Initialize previous turn variables
-        prev_text = ""
-        prev_readability = 0.0
-        # ================================================================
-        
-        print(f"  📊 Computing {len(df)} message metrics...")
-        
-        # Compute per-message metrics
-        for i, row in df.iterrows():
-            text = row["content"]
-            role = row["role"]
-            
-            # Language metrics
-            entropy = compute_entropy(text)
-            entropy_scores.append(entropy)
-            readability = compute_readability(text)
-            readability_scores.append(readability)
-            lex_rich = compute_lexical_richness(text)
-            lexdiv_scores.append(lex_rich['ttr'])
+        # Sentiment with scores
+        metrics.write(i, 'sentiment', compute_sentiment(text, sentiment_scores[i]))
+        timer.lap("sentiment")
+        
+        # Language metrics
+        entropy = compute_entropy(text)
+        metrics.write(i, 'entropy', entropy)
+        readability = compute_readability(text, syllable_counts[i])
+        metrics.write(i, 'readability', readability)
+        metrics.write(i, 'lexical_richness', compute_lexical_richness(text))
+        timer.lap("language_metrics")
+        
+        if not vectorized:
+            # One lexicon pass feeds every pattern family below
+            lexicon = lexicon_scanner.scan(text)
             
             # Enhanced structural metrics
-            struct_metrics = compute_enhanced_structural_metrics(text)
-            contradictions.append(struct_metrics['total_contradictions'])
-            elaborations.append(struct_metrics['total_elaborations'])
-            contradiction_ratios.append(struct_metrics['contradiction_ratio'])
-            negations.append(struct_metrics['negations'])
-            adversatives.append(struct_metrics['adversatives'])
-            hedges_list.append(struct_metrics['hedges'])
-            confidence_list.append(struct_metrics['confidence_markers'])
-            epistemic_stance_list.append(struct_metrics['epistemic_stance'])
+            metrics.write(i, 'structural', compute_enhanced_structural_metrics(text, lexicon))
             
             # =============================================================================
             # NEW METRICS COMPUTATION
             # =============================================================================
-            
-            # 1. Cognitive Load
-            cog = compute_cognitive_load(text)
-            cog_load_totals.append(cog['cognitive_load_total'])
-            cog_load_densities.append(cog['cognitive_load_density'])
-            complex_connectors.append(cog['complex_connectors'])
-            abstraction_markers.append(cog['abstraction_markers'])
-            metacognitive_markers.append(cog['metacognitive_markers'])
-            computational_markers.append(cog['computational_markers'])
-            conditional_complexity.append(cog['conditional_complexity'])
-            
-            # 2. Coherence Chains
-            coh = compute_coherence_chains(text, prev_text)
-            reference_densities.append(coh['reference_density'])
-            anaphoric_refs.append(coh['anaphoric_references'])
-            demonstrative_refs.append(coh['demonstrative_references'])
-            comparative_refs.append(coh['comparative_references'])
-            continuity_markers.append(coh['continuity_markers'])
-            entity_continuities.append(coh['entity_continuity'])
-            
-            # 3. Affective Trajectory
-            aff = compute_affective_trajectory(text)
-            dominant_affects.append(aff['dominant_affect'])
-            affective_intensities.append(aff['affective_intensity'])
-            affective_diversities.append(aff['affective_diversity'])
-            curiosity_scores.append(aff['curiosity_score'])
-            confusion_scores.append(aff['confusion_score'])
-            satisfaction_scores.append(aff['satisfaction_score'])
-            frustration_scores.append(aff['frustration_score'])
-            surprise_scores.append(aff['surprise_score'])
-            engagement_scores.append(aff['engagement_score'])
-            
-            # 4. Repair Patterns
-            rep = compute_repair_patterns(text, role)
-            total_repairs.append(rep['total_repair_markers'])
-            repair_types.append(rep['repair_type'])
-            self_corrections.append(rep['self_corrections'])
-            clarification_requests.append(rep['clarification_requests'])
-            confirmation_checks.append(rep['confirmation_checks'])
-            elaboration_requests_list.append(rep['elaboration_requests'])
-            repetitions.append(rep['repetitions'])
-            
-            # 5. Knowledge Construction
-            know = compute_knowledge_construction(text)
-            knowledge_scores.append(know['knowledge_construction_score'])
-            construction_phases.append(know['construction_phase'])
-            joint_attention.append(know['joint_attention_markers'])
-            hypothesis_markers.append(know['hypothesis_markers'])
-            evidence_markers_list.append(know['evidence_markers'])
-            synthesis_markers.append(know['synthesis_markers'])
-            perspective_markers.append(know['perspective_markers'])
-            
-            # 6. Social Presence
-            soc = compute_social_presence(text)
-            social_scores.append(soc['social_presence_score'])
-            rapport_indices.append(soc['rapport_index'])
-            acknowledgments.append(soc['acknowledgments'])
-            encouragements.append(soc['encouragements'])
-            empathy_markers_list.append(soc['empathy_markers'])
-            solidarity_markers.append(soc['solidarity_markers'])
-            politeness_markers_list.append(soc['politeness_markers'])
-            humor_markers.append(soc['humor_markers'])
-            
-            # 7. Argumentation Structure
-            arg = compute_argumentation_structure(text)
-            argument_structures.append(arg['argument_structure'])
-            argument_qualities.append(arg['argument_quality'])
-            claim_markers.append(arg['claim_markers'])
-            evidence_markers_arg.append(arg['evidence_markers'])
-            warrant_markers.append(arg['warrant_markers'])
-            qualifier_markers.append(arg['qualifier_markers'])
-            rebuttal_markers.append(arg['rebuttal_markers'])
-            
-            # 8. Temporal Dynamics
-            temp = compute_temporal_dynamics(text, row.get('response_time'))
-            temporal_orientations.append(temp['temporal_orientation'])
-            urgency_levels.append(temp['urgency_level'])
-            urgency_markers.append(temp['urgency_markers'])
-            reflection_markers.append(temp['reflection_markers'])
-            projection_markers.append(temp['projection_markers'])
-            pace_markers.append(temp['pace_markers'])
-            
-            # =============================================================================
-            # NEW v3.2: Compute cognitive coupling metrics
-            # =============================================================================
-            word_count = row['word_count']
-            iei = compute_iei(entropy, word_count)
-            mirroring = compute_mirroring(prev_text, text)
-            asymmetry = round(abs(readability - prev_readability), 2) if prev_readability else 0.0
-            refusals = len(re.findall(REFUSAL_PATTERNS, text.lower()))
-            
-            iei_list.append(iei)
-            mirroring_list.append(mirroring)
-            asymmetry_list.append(asymmetry)
-            refusals_list.append(refusals)
-            
-            # Update previous turn variables for next iteration
-            prev_text = text
-            prev_readability = readability
-            # =============================================================================
-            
-            # BLEU/METEOR/ROUGE (for assistant responses)
-            if row["role"] == "assistant" and i > 0:
-                ref = df.iloc[i-1]["content"]
-                cand = row["content"]
-                bleu_scores.append(compute_bleu(ref, cand))
-                meteor_scores.append(compute_meteor(ref, cand))
-                rouge_scores = compute_rouge(ref, cand)
-                rouge1_scores.append(rouge_scores.get("rouge1", 0))
-                rougeL_scores.append(rouge_scores.get("rougeL", 0))
-            else:
-                bleu_scores.append(None)
-                meteor_scores.append(None)
-                rouge1_scores.append(None)
-                rougeL_scores.append(None)
-        
-        # Add original metrics to DataFrame
-        df["BLEU"] = bleu_scores
-        df["METEOR"] = meteor_scores
-        df["ROUGE-1"] = rouge1_scores
-        df["ROUGE-L"] = rougeL_scores
-        df["Entropy"] = entropy_scores
-        df["Readability"] = readability_scores
-        df["Lexical Diversity"] = lexdiv_scores
-        df["Contradictions"] = contradictions
-        df["Elaborations"] = elaborations
-        df["Contra:Elab Ratio"] = contradiction_ratios
-        df["Negations"] = negations
-        df["Adversatives"] = adversatives
-        df["Hedges"] = hedges_list
-        df["Confidence Markers"] = confidence_list
-        df["Epistemic Stance"] = epistemic_stance_list
+            metrics.write(i, 'cognitive_load', compute_cognitive_load(text, lexicon))
+            metrics.write(i, 'coherence', compute_coherence_chains(text, prev_text, lexicon))
+            metrics.write(i, 'affective', compute_affective_trajectory(text, lexicon))
+            metrics.write(i, 'repair', compute_repair_patterns(text, role, lexicon))
+            metrics.write(i, 'knowledge', compute_knowledge_construction(text, lexicon))
+            metrics.write(i, 'social_presence', compute_social_presence(text, lexicon))
+            metrics.write(i, 'argumentation', compute_argumentation_structure(text, lexicon))
+            metrics.write(i, 'temporal', compute_temporal_dynamics(text, row.get('response_time'), lexicon))
+            metrics.write(i, 'refusal', lexicon['refusal']['refusal'])
+            timer.lap("lexicon_scan")
+        metrics.write(i, 'entity_continuity', compute_entity_continuity(text, prev_text))
         
         # =============================================================================
-        # ADD NEW METRICS TO DATAFRAME
+        # NEW v3.2: Compute cognitive coupling metrics
         # =============================================================================
+        metrics.write(i, 'coupling', {
+            'iei': compute_iei(entropy, row['word_count']),
+            'mirroring': compute_mirroring(prev_text, text),
+            'asymmetry': round(abs(readability - prev_readability), 2) if prev_readability else 0.0
+        })
         
-        # Cognitive Load
-        df["Cognitive_Load_Total"] = cog_load_totals
-        df["Cognitive_Load_Density"] = cog_load_densities
-        df["Complex_Connectors"] = complex_connectors
-        df["Abstraction_Markers"] = abstraction_markers
-        df["Metacognitive_Markers"] = metacognitive_markers
-        df["Computational_Markers"] = computational_markers
-        df["Conditional_Complexity"] = conditional_complexity
-        
-        # Coherence Chains
-        df["Reference_Density"] = reference_densities
-        df["Anaphoric_Refs"] = anaphoric_refs
-        df["Demonstrative_Refs"] = demonstrative_refs
-        df["Comparative_Refs"] = comparative_refs
-        df["Continuity_Markers"] = continuity_markers
-        df["Entity_Continuity"] = entity_continuities
-        
-        # Affective Trajectory
-        df["Dominant_Affect"] = dominant_affects
-        df["Affective_Intensity"] = affective_intensities
-        df["Affective_Diversity"] = affective_diversities
-        df["Curiosity_Score"] = curiosity_scores
-        df["Confusion_Score"] = confusion_scores
-        df["Satisfaction_Score"] = satisfaction_scores
-        df["Frustration_Score"] = frustration_scores
-        df["Surprise_Score"] = surprise_scores
-        df["Engagement_Score"] = engagement_scores
-        
-        # Repair Patterns
-        df["Total_Repair_Markers"] = total_repairs
-        df["Repair_Type"] = repair_types
-        df["Self_Corrections"] = self_corrections
-        df["Clarification_Requests"] = clarification_requests
-        df["Confirmation_Checks"] = confirmation_checks
-        df["Elaboration_Requests"] = elaboration_requests_list
-        df["Repetitions"] = repetitions
-        
-        # Knowledge Construction
-        df["Knowledge_Construction_Score"] = knowledge_scores
-        df["Construction_Phase"] = construction_phases
-        df["Joint_Attention"] = joint_attention
-        df["Hypothesis_Markers"] = hypothesis_markers
-        df["Evidence_Markers"] = evidence_markers_list
-        df["Synthesis_Markers"] = synthesis_markers
-        df["Perspective_Markers"] = perspective_markers
-        
-        # Social Presence
-        df["Social_Presence_Score"] = social_scores
-        df["Rapport_Index"] = rapport_indices
-        df["Acknowledgments"] = acknowledgments
-        df["Encouragements"] = encouragements
-        df["Empathy_Markers"] = empathy_markers_list
-        df["Solidarity_Markers"] = solidarity_markers
-        df["Politeness_Markers"] = politeness_markers_list
-        df["Humor_Markers"] = humor_markers
-        
-        # Argumentation
-        df["Argument_Structure"] = argument_structures
-        df["Argument_Quality"] = argument_qualities
-        df["Claim_Markers"] = claim_markers
-        df["Argument_Evidence_Markers"] = evidence_markers_arg
-        df["Warrant_Markers"] = warrant_markers
-        df["Qualifier_Markers"] = qualifier_markers
-        df["Rebuttal_Markers"] = rebuttal_markers
-        
-        # Temporal Dynamics
-        df["Temporal_Orientation"] = temporal_orientations
-        df["Urgency_Level"] = urgency_levels
-        df["Urgency_Markers"] = urgency_markers
-        df["Reflection_Markers"] = reflection_markers
-        df["Projection_Markers"] = projection_markers
-        df["Pace_Markers"] = pace_markers
-        
-        # =============================================================================
-        # NEW v3.2: Add cognitive coupling columns
-        # =============================================================================
-        df["IEI_Efficiency"] = iei_list
-        df["Lexical_Mirroring"] = mirroring_list
-        df["Cognitive_Asymmetry"] = asymmetry_list
-        df["Refusal_Markers"] = refusals_list
-        # =============================================================================
-        
-        # Compute thread-level metrics
-        print(f"  🔍 Computing thread-level analysis...")
-        
-        flow_data = compute_keyword_flow(df)
-        sentiment_shift = compute_sentiment_shift(df["sentiment"].tolist())
-        
-        # Analyze turn pairs
+        # Update previous turn variables for next iteration
+        prev_text = text
+        prev_readability = readability
+        timer.lap("coupling")
+    
+    # BLEU/METEOR/ROUGE (for assistant responses), scored as one batch of pairs
+    if not options.skip_mt_metrics:
+        mt_rows = [i for i in to_compute if i > 0 and df.at[i, "role"] == "assistant"]
+        mt_scores = compute_mt_metrics([(message_tokens[i-1], message_tokens[i]) for i in mt_rows])
+        for i, values in zip(mt_rows, mt_scores):
+            metrics.write(i, 'mt', values)
+        timer.lap("mt_metrics")
+    
+    if cache is not None:
+        for i in to_compute:
+            cache.put(row_keys[i], metrics.row_values(i))
+        cache.flush()
+        timer.lap("cache_store")
+    
+    # Add all metric columns to the DataFrame in one step; timestamps stay epoch
+    # seconds through the analysis and are only formatted here, for export
+    df = pd.concat([df, metrics.to_frame(df.index)], axis=1)
+    df["timestamp"] = format_timestamps(df["timestamp"].to_numpy(dtype=np.float64))
+    timer.lap("dataframe")
+    
+    # Compute thread-level metrics
+    print(f"  🔍 Computing thread-level analysis...")
+    
+    flow_data = compute_keyword_flow(df, keyword_sets(message_tokens))
+    sentiment_shift = compute_sentiment_shift(df["sentiment"].tolist())
+    timer.lap("keyword_flow")
+    
+    # Analyze turn pairs (only pairs touching new messages when resuming)
+    if resume:
+        turn_pairs = resume["turn_pairs"] + analyze_turn_pairs(df, start=max(n_resumed - 1, 0))
+    else:
         turn_pairs = analyze_turn_pairs(df)
-        avg_response_ratio = np.mean([p['response_ratio'] for p in turn_pairs]) if turn_pairs else 0
-        avg_semantic_overlap = np.mean([p['semantic_overlap'] for p in turn_pairs]) if turn_pairs else 0
-        
-        # Convergence detection
-        if len(df) >= 20:
-            convergence_data = detect_convergence_patterns(df, window_size=10)
-            if convergence_data:
-                final_trend = convergence_data[-1]['contradiction_trend']
-            else:
-                final_trend = 'insufficient_data'
+    avg_response_ratio = np.mean([p['response_ratio'] for p in turn_pairs]) if turn_pairs else 0
+    avg_semantic_overlap = np.mean([p['semantic_overlap'] for p in turn_pairs]) if turn_pairs else 0
+    timer.lap("turn_pairs")
+    
+    # Convergence detection
+    if len(df) >= 20:
+        # When resuming, only windows reaching into new messages (and the last one) are recomputed
+        convergence_data = detect_convergence_patterns(df, window_size=10, start=min(n_resumed, len(df) - 1))
+        if convergence_data:
+            final_trend = convergence_data[-1]['contradiction_trend']
         else:
             final_trend = 'insufficient_data'
-        
-        # Write main sheet to main output file
-        df.to_excel(main_writer, sheet_name=safe_title, index=False)
-        ws = main_writer.sheets[safe_title]
-        
-        # Format sheet
-        ws.write_url('A1', "internal:'Thread Summary'!A1", string="⬅ BACK TO SUMMARY")
-        ws.freeze_panes(1, 1)
-        ws.set_row(0, None, header_fmt_main)
-        
-        # Set column widths
-        column_widths = {
-            'Seq. #': 10, 'timestamp': 20, 'role': 12, 'content': 50, 
-            'word_count': 12, 'token_count': 12, 'sentence_count': 12,
-            'sentiment': 12, 'sentiment_score': 12, 'subjectivity': 12,
-            'model': 15, 'dialogue_act': 15, 'response_time': 15,
-            'BLEU': 10, 'METEOR': 10, 'ROUGE-1': 10, 'ROUGE-L': 10,
-            'Entropy': 10, 'Readability': 12, 'Lexical Diversity': 15,
-            'Contradictions': 13, 'Elaborations': 12, 'Contra:Elab Ratio': 15,
-            'Negations': 10, 'Adversatives': 12, 'Hedges': 10,
-            'Confidence Markers': 15, 'Epistemic Stance': 15,
-            'edit_count': 10, 'edit_similarity': 15,
-            # New metrics
-            'Cognitive_Load_Total': 15, 'Cognitive_Load_Density': 15,
-            'Complex_Connectors': 15, 'Abstraction_Markers': 15,
-            'Metacognitive_Markers': 18, 'Computational_Markers': 18,
-            'Conditional_Complexity': 18, 'Reference_Density': 15,
-            'Anaphoric_Refs': 15, 'Demonstrative_Refs': 17,
-            'Comparative_Refs': 16, 'Continuity_Markers': 16,
-            'Entity_Continuity': 15, 'Dominant_Affect': 15,
-            'Affective_Intensity': 16, 'Affective_Diversity': 17,
-            'Curiosity_Score': 14, 'Confusion_Score': 14,
-            'Satisfaction_Score': 16, 'Frustration_Score': 15,
-            'Surprise_Score': 13, 'Engagement_Score': 15,
-            'Total_Repair_Markers': 17, 'Repair_Type': 13,
-            'Self_Corrections': 15, 'Clarification_Requests': 18,
-            'Confirmation_Checks': 17, 'Elaboration_Requests': 18,
-            'Repetitions': 12, 'Knowledge_Construction_Score': 20,
-            'Construction_Phase': 16, 'Joint_Attention': 15,
-            'Hypothesis_Markers': 17, 'Evidence_Markers': 15,
-            'Synthesis_Markers': 16, 'Perspective_Markers': 17,
-            'Social_Presence_Score': 17, 'Rapport_Index': 13,
-            'Acknowledgments': 14, 'Encouragements': 14,
-            'Empathy_Markers': 14, 'Solidarity_Markers': 16,
-            'Politeness_Markers': 16, 'Humor_Markers': 13,
-            'Argument_Structure': 16, 'Argument_Quality': 15,
-            'Claim_Markers': 13, 'Argument_Evidence_Markers': 20,
-            'Warrant_Markers': 14, 'Qualifier_Markers': 15,
-            'Rebuttal_Markers': 15, 'Temporal_Orientation': 17,
-            'Urgency_Level': 13, 'Urgency_Markers': 14,
-            'Reflection_Markers': 16, 'Projection_Markers': 16,
-            'Pace_Markers': 12,
-            # v3.2 columns
-            'IEI_Efficiency': 14, 'Lexical_Mirroring': 18, 'Cognitive_Asymmetry': 18, 'Refusal_Markers': 14
-        }
-        
-        for col_idx, col_name in enumerate(df.columns):
-            width = column_widths.get(col_name, 15)
-            ws.set_column(col_idx, col_idx, width, center_fmt_main)
-        
-        print(f"  ✅ Processed {len(df)} messages\n")
-        
-        # Prepare summary row with new metrics
-        summary_rows.append({
-            "Thread": safe_title,
-            "Duration": conversation_duration,
-            "Total Messages": len(df),
-            "User Turns": len(df[df["role"]=="user"]),
-            "Assistant Turns": len(df[df["role"]=="assistant"]),
-            "Avg Words": round(df["word_count"].mean(), 1),
-            "Total Tokens": df["token_count"].sum(),
-            "Sentiment Shift": sentiment_shift,
-            "Avg Response Time (s)": round(df["response_time"].dropna().mean(), 1),
-            "Avg Entropy": round(df["Entropy"].mean(), 2),
-            "Avg Readability": round(df["Readability"].mean(), 1),
-            "Avg Lexical Diversity": round(df["Lexical Diversity"].mean(), 3),
-            "Flow Edges": flow_data['flow_edges'],
-            "Keyword Persistence": flow_data['avg_persistence'],
-            "Top Keyphrases": ", ".join(flow_data['top_keywords']),
-            "Total Edits": int(df["edit_count"].sum()),
-            "Avg Edit Similarity": round(df["edit_similarity"].dropna().mean(), 3),
-            "Total Elaborations": int(df["Elaborations"].sum()),
-            "Total Contradictions": int(df["Contradictions"].sum()),
-            "Contra:Elab Ratio": round(df["Contradictions"].sum() / df["Elaborations"].sum(), 2) if df["Elaborations"].sum() > 0 else float('inf'),
-            "Avg Hedges": round(df["Hedges"].mean(), 1),
-            "Avg Confidence": round(df["Confidence Markers"].mean(), 1),
-            "Avg Response Ratio": round(avg_response_ratio, 2),
-            "Avg Semantic Overlap": round(avg_semantic_overlap, 3),
-            "Convergence Trend": final_trend,
-            # New summary metrics
-            "Avg_Cognitive_Load": round(df["Cognitive_Load_Density"].mean(), 2),
-            "Avg_Coherence": round(df["Entity_Continuity"].dropna().mean(), 3),
-            "Dominant_Affect_Thread": df["Dominant_Affect"].mode()[0] if not df["Dominant_Affect"].empty else 'neutral',
-            "Total_Repairs": int(df["Total_Repair_Markers"].sum()),
-            "Self_Repair_Rate": round(df["Self_Corrections"].sum() / len(df), 3),
-            "Knowledge_Phase_Final": df["Construction_Phase"].iloc[-1] if not df.empty else 'unknown',
-            "Avg_Social_Presence": round(df["Social_Presence_Score"].mean(), 2),
-            "Avg_Rapport": round(df["Rapport_Index"].mean(), 2),
-            "Complete_Arguments": len(df[df["Argument_Structure"] == "complete_argument"]),
-            "Urgency_High_Count": len(df[df["Urgency_Level"] == "high"]),
-            "Temporal_Focus": df["Temporal_Orientation"].mode()[0] if not df["Temporal_Orientation"].empty else 'present_focused'
+    else:
+        final_trend = 'insufficient_data'
+    timer.lap("convergence")
+    
+    # Prepare summary row with new metrics
+    summary_row = {
+        "Thread": safe_title,
+        "Duration": conversation_duration,
+        "Total Messages": len(df),
+        "User Turns": len(df[df["role"]=="user"]),
+        "Assistant Turns": len(df[df["role"]=="assistant"]),
+        "Avg Words": round(df["word_count"].mean(), 1),
+        "Total Tokens": df["token_count"].sum(),
+        "Sentiment Shift": sentiment_shift,
+        "Avg Response Time (s)": round(df["response_time"].dropna().mean(), 1),
+        "Avg Entropy": round(df["Entropy"].mean(), 2),
+        "Avg Readability": round(df["Readability"].mean(), 1),
+        "Avg Lexical Diversity": round(df["Lexical Diversity"].mean(), 3),
+        "Flow Edges": flow_data['flow_edges'],
+        "Keyword Persistence": flow_data['avg_persistence'],
+        "Top Keyphrases": ", ".join(flow_data['top_keywords']),
+        "Total Edits": int(df["edit_count"].sum()),
+        "Avg Edit Similarity": round(df["edit_similarity"].dropna().mean(), 3),
+        "Total Elaborations": int(df["Elaborations"].sum()),
+        "Total Contradictions": int(df["Contradictions"].sum()),
+        "Contra:Elab Ratio": round(df["Contradictions"].sum() / df["Elaborations"].sum(), 2) if df["Elaborations"].sum() > 0 else float('inf'),
+        "Avg Hedges": round(df["Hedges"].mean(), 1),
+        "Avg Confidence": round(df["Confidence Markers"].mean(), 1),
+        "Avg Response Ratio": round(avg_response_ratio, 2),
+        "Avg Semantic Overlap": round(avg_semantic_overlap, 3),
+        "Convergence Trend": final_trend,
+        # New summary metrics
+        "Avg_Cognitive_Load": round(df["Cognitive_Load_Density"].mean(), 2),
+        "Avg_Coherence": round(df["Entity_Continuity"].dropna().mean(), 3),
+        "Dominant_Affect_Thread": df["Dominant_Affect"].mode()[0] if not df["Dominant_Affect"].empty else 'neutral',
+        "Total_Repairs": int(df["Total_Repair_Markers"].sum()),
+        "Self_Repair_Rate": round(df["Self_Corrections"].sum() / len(df), 3),
+        "Knowledge_Phase_Final": df["Construction_Phase"].iloc[-1] if not df.empty else 'unknown',
+        "Avg_Social_Presence": round(df["Social_Presence_Score"].mean(), 2),
+        "Avg_Rapport": round(df["Rapport_Index"].mean(), 2),
+        "Complete_Arguments": len(df[df["Argument_Structure"] == "complete_argument"]),
+        "Urgency_High_Count": len(df[df["Urgency_Level"] == "high"]),
+        "Temporal_Focus": df["Temporal_Orientation"].mode()[0] if not df["Temporal_Orientation"].empty else 'present_focused'
+    }
+    timer.lap("summary")
+    
+    # =============================================================================
+    # COLLECT DATA FOR MATRICES (global and per-thread)
+    # =============================================================================
+    
+    # --- Act transitions ---
+    act_transitions = act_transition_counts([m["dialogue_act"] for m in rows])
+    
+    # --- Per-thread numeric data for correlation ---
+    # Select numeric columns, drop those with all NaN or constant if needed
+    numeric_df = df.select_dtypes(include=[np.number])
+    # Exclude columns that are not meaningful for correlation (like index columns)
+    exclude_cols = ['Seq. #'] if 'Seq. #' in numeric_df.columns else []
+    numeric_df = numeric_df.drop(columns=exclude_cols, errors='ignore')
+    timer.lap("matrices")
+    
+    return {
+        "df": df,
+        "summary_row": summary_row,
+        "act_transitions": act_transitions,
+        "numeric_df": numeric_df,
+        "metrics": metrics,
+        "turn_pairs": turn_pairs,
+        "trailing": trailing,
+        "computed": len(to_compute),
+        "row_cache_hits": len(cached_rows) - n_resumed
+    }
+
+def thread_trailing_state(rows):
+    """The `state` compute_turntaking_metrics and detect_response_edits leave after `rows`"""
+    known = [m["timestamp"] for m in rows if not np.isnan(m["timestamp"])]
+    return {
+        "prev_time": known[-1] if known else None,
+        "prev_role": rows[-1]["role"] if rows else None,
+        "prev_assistant": next((m["content"] for m in reversed(rows) if m["role"] == "assistant"), None)
+    }
+
+def analyze_branches(tree, current_path, current_tokens, current, safe_title, options, cache=None, timer=None):
+    """
+    Summary rows for every branch of a conversation with regenerated or edited turns.
+
+    Each root-to-leaf branch is analyzed like a thread, but analyzed messages are
+    remembered by node id: the prefix a branch shares with earlier branches is
+    resumed rather than recomputed, so every message is tokenized and scored once
+    however many branches contain it. `current` is the analyze_thread result of
+    the current branch (`current_path`, the node ids of its messages). Each row
+    also says where the branch leaves the current one and how different its
+    first message there is (sibling divergence).
+    """
+    timer = timer or StageTimer(False)
+    analyzed = {}   # node id -> (MessageTokens, metric row values, turn pair starting there)
+    
+    def remember(path, message_tokens, thread):
+        pairs = {pair["pair_index"]: pair for pair in thread["turn_pairs"]}
+        for i, node_id in enumerate(path):
+            if node_id not in analyzed:
+                analyzed[node_id] = (message_tokens[i], thread["metrics"].row_values(i), pairs.get(i))
+    
+    remember(current_path, current_tokens, current)
+    current_rows = [tree.row(node_id) for node_id in current_path]
+    branch_rows = []
+    for leaf_path in tree.branches():
+        path = tree.message_path(leaf_path)
+        if not path:
+            continue
+        rows = [tree.row(node_id) for node_id in path]
+        if path == current_path:
+            thread = current
+        else:
+            shared = 0
+            while shared < len(path) and path[shared] in analyzed:
+                shared += 1
+            message_tokens = [analyzed[node_id][0] for node_id in path[:shared]] + tokenize_messages(rows[shared:], cache)
+            resume = None
+            if shared:
+                resume = {
+                    "count": shared,
+                    "trailing": thread_trailing_state(rows[:shared]),
+                    "derived": [[m[field] for field in THREAD_STATE_FIELDS] for m in rows[:shared]],
+                    "metrics": [analyzed[node_id][1] for node_id in path[:shared]],
+                    "turn_pairs": [analyzed[node_id][2] for node_id in path[:shared - 1] if analyzed[node_id][2]]
+                }
+            timer.lap("branches")
+            thread = analyze_thread(safe_title, rows, message_tokens, options, cache, resume, timer)
+            remember(path, message_tokens, thread)
+        
+        # Sibling divergence: the first message where this branch and the current one differ
+        fork = 0
+        while fork < min(len(path), len(current_path)) and path[fork] == current_path[fork]:
+            fork += 1
+        is_current = path == current_path
+        similarity = length_ratio = None
+        if not is_current and fork < len(path) and fork < len(current_rows):
+            ours, theirs = rows[fork], current_rows[fork]
+            similarity = round(edit_similarity_ratio(theirs["content"], ours["content"]), 3)
+            length_ratio = round(ours["word_count"] / theirs["word_count"], 2) if theirs["word_count"] else None
+        summary = dict(thread["summary_row"])
+        branch_rows.append({
+            "Thread": summary.pop("Thread"),
+            "Branch": len(branch_rows) + 1,
+            "Current Branch": "yes" if is_current else "no",
+            "Leaf Node": leaf_path[-1],
+            "Shared Messages": fork,
+            "Fork Seq. #": None if is_current else f"#{fork + 1}",
+            "Divergence Similarity": similarity,
+            "Divergence Length Ratio": length_ratio,
+            **summary
         })
-        
-        # =============================================================================
-        # COLLECT DATA FOR MATRICES (global and per-thread)
-        # =============================================================================
-        
-        # --- Global act transition ---
-        msgs = rows  # list of dicts with 'dialogue_act'
-        for i in range(len(msgs)-1):
-            current_act = msgs[i].get("dialogue_act")
-            next_act = msgs[i+1].get("dialogue_act")
-            if current_act and next_act:
-                global_act_counts[current_act][next_act] += 1
-        
-        # --- Global messages list for correlation ---
-        for _, row in df.iterrows():
-            msg_dict = row.to_dict()
-            msg_dict['thread'] = safe_title
-            all_messages_list.append(msg_dict)
-        
-        # --- Per-thread act transition ---
-        thread_act_counts[safe_title] = defaultdict(lambda: defaultdict(int))
-        for i in range(len(msgs)-1):
-            current_act = msgs[i].get("dialogue_act")
-            next_act = msgs[i+1].get("dialogue_act")
-            if current_act and next_act:
-                thread_act_counts[safe_title][current_act][next_act] += 1
-        
-        # --- Per-thread numeric data for correlation ---
-        # Select numeric columns, drop those with all NaN or constant if needed
-        numeric_df = df.select_dtypes(include=[np.number])
-        # Exclude columns that are not meaningful for correlation (like index columns)
-        exclude_cols = ['Seq. #'] if 'Seq. #' in numeric_df.columns else []
-        numeric_df = numeric_df.drop(columns=exclude_cols, errors='ignore')
-        thread_numeric_data[safe_title] = numeric_df
-        
-        process_notes.append(f"✅ '{title}' -> {len(df)} messages analyzed")
+        timer.lap("branches")
+    return branch_rows
+
+def analyze_conversation(chat_idx, chat, options=None):
+    """
+    Compute every per-message and thread-level metric of one conversation.
+
+    Runs in a worker process when --workers > 1, so everything the parent needs
+    to merge the thread into the workbooks is returned rather than written here.
+    `options` are the parsed command-line options (defaults when None).
+    Returns None when the conversation has no messages.
+    """
+    if options is None:
+        options = parse_args([])
+    timer = StageTimer(profiling_enabled(options))
+    syllable_memo = _count_syllables_lower.cache_info()
+    token_memo = dict(_token_memo_stats)
+    cache = get_metric_cache(options)
+    cache_lookups = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    title = chat.get("title", "Untitled Chat")
+    safe_title = re.sub(r'[\\/*?:[\]]', '_', title)[:31]
     
-    # === Thread Summary Sheet (main output) ===
+    print(f"[{chat_idx}] Processing: {title}")
+    
+    # Extract messages along the branch last shown in ChatGPT
+    tree = ConversationTree(chat)
+    path = tree.message_path(tree.current_path())
+    rows = [tree.row(node_id) for node_id in path]
+    
+    if not rows:
+        print(f"  ⚠️  No messages found, skipping...\n")
+        return None
+    timer.lap("extract")
+    
+    # Tokenize every message once; counts and all metric functions share these
+    message_tokens = tokenize_messages(rows, cache)
+    timer.lap("tokenize")
+    
+    # Incremental mode: resume from the state saved for this thread by the last
+    # run when the thread has only gained messages since then
+    conversation_id = conversation_id_of(chat)
+    resume = None
+    if options.incremental and cache is not None and conversation_id:
+        saved = cache.get_thread_state(conversation_id)
+        if (saved and saved["count"] <= len(rows)
+                and saved.get("skip_mt_metrics", False) == options.skip_mt_metrics
+                and saved.get("edit_similarity") == options.edit_similarity
+                and saved["digest"] == thread_prefix_digest(rows[:saved["count"]])):
+            resume = saved
+    timer.lap("incremental_resume")
+    
+    thread = analyze_thread(safe_title, rows, message_tokens, options, cache, resume, timer)
+    df = thread["df"]
+    
+    if options.incremental and cache is not None and conversation_id:
+        cache.put_thread_state(conversation_id, {
+            "digest": thread_prefix_digest(rows),
+            "count": len(rows),
+            "trailing": thread["trailing"],
+            "derived": [[m[field] for field in THREAD_STATE_FIELDS] for m in rows],
+            "metrics": [thread["metrics"].row_values(i) for i in range(len(df))],
+            "turn_pairs": thread["turn_pairs"],
+            "skip_mt_metrics": options.skip_mt_metrics,
+            "edit_similarity": options.edit_similarity
+        })
+        timer.lap("cache_store")
+    
+    # Every regenerated branch, sharing the work done for the current one
+    branch_rows = None
+    if options.branches == "all":
+        branch_rows = analyze_branches(tree, path, message_tokens, thread, safe_title, options, cache, timer)
+    
+    print(f"  ✅ Processed {len(df)} messages\n")
+    
+    # Stage timings and cache counters travel back with the result (None when not profiling)
+    profile = None
+    if timer.enabled:
+        syllables_now = _count_syllables_lower.cache_info()
+        profile = {
+            "messages": len(df),
+            "computed": thread["computed"],
+            "resumed": resume["count"] if resume else 0,
+            "row_cache_hits": thread["row_cache_hits"],
+            "syllable_memo_hits": syllables_now.hits - syllable_memo.hits,
+            "syllable_memo_misses": syllables_now.misses - syllable_memo.misses,
+            "token_memo_hits": _token_memo_stats["hits"] - token_memo["hits"],
+            "token_memo_misses": _token_memo_stats["misses"] - token_memo["misses"],
+            "metric_cache_hits": cache.hits - cache_lookups[0] if cache is not None else 0,
+            "metric_cache_misses": cache.misses - cache_lookups[1] if cache is not None else 0,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": timer.stages
+        }
+    
+    return {
+        "chat_idx": chat_idx,
+        "title": title,
+        "safe_title": safe_title,
+        "df": df,
+        "summary_row": thread["summary_row"],
+        "act_transitions": thread["act_transitions"],
+        "numeric_df": thread["numeric_df"],
+        "branch_rows": branch_rows,
+        "profile": profile
+    }
 
-    summary_df = pd.DataFrame(summary_rows)
-    summary_df.to_excel(main_writer, sheet_name="Thread Summary", index=False)
-    summary_ws = main_writer.sheets["Thread Summary"]
+
+# === Parallel Execution ===
+def iter_analyses(conversations, workers=1, options=None):
+    """
+    Yield analyze_conversation results in input order.
+
+    With more than one worker, conversations are spread across a process pool.
+    At most two conversations per worker are in flight, so streamed input is
+    never read far ahead, and results are merged in the same fixed order
+    whatever the worker count.
+    """
+    if workers <= 1:
+        for chat_idx, chat in enumerate(conversations, 1):
+            yield analyze_conversation(chat_idx, chat, options)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chat_idx, chat in enumerate(conversations, 1):
+            pending.append(pool.submit(analyze_conversation, chat_idx, chat, options))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+# === Thread Sheet Output ===
+def write_thread_sheet(workbook, sheet_name, df, header_fmt, center_fmt):
+    """Write one thread's per-message metrics to its own sheet of the main workbook"""
+    ws = workbook.add_worksheet(sheet_name)
+    
+    # Format sheet (row and column formats must be set before rows are streamed)
+    ws.freeze_panes(1, 1)
+    ws.set_row(0, None, header_fmt)
+    
+    # Set column widths
+    column_widths = {
+        'Seq. #': 10, 'timestamp': 20, 'role': 12, 'content': 50, 
+        'word_count': 12, 'token_count': 12, 'sentence_count': 12,
+        'sentiment': 12, 'sentiment_score': 12, 'subjectivity': 12,
+        'model': 15, 'dialogue_act': 15, 'response_time': 15,
+        'BLEU': 10, 'METEOR': 10, 'ROUGE-1': 10, 'ROUGE-L': 10,
+        'Entropy': 10, 'Readability': 12, 'Lexical Diversity': 15,
+        'Contradictions': 13, 'Elaborations': 12, 'Contra:Elab Ratio': 15,
+        'Negations': 10, 'Adversatives': 12, 'Hedges': 10,
+        'Confidence Markers': 15, 'Epistemic Stance': 15,
+        'edit_count': 10, 'edit_similarity': 15,
+        # New metrics
+        'Cognitive_Load_Total': 15, 'Cognitive_Load_Density': 15,
+        'Complex_Connectors': 15, 'Abstraction_Markers': 15,
+        'Metacognitive_Markers': 18, 'Computational_Markers': 18,
+        'Conditional_Complexity': 18, 'Reference_Density': 15,
+        'Anaphoric_Refs': 15, 'Demonstrative_Refs': 17,
+        'Comparative_Refs': 16, 'Continuity_Markers': 16,
+        'Entity_Continuity': 15, 'Dominant_Affect': 15,
+        'Affective_Intensity': 16, 'Affective_Diversity': 17,
+        'Curiosity_Score': 14, 'Confusion_Score': 14,
+        'Satisfaction_Score': 16, 'Frustration_Score': 15,
+        'Surprise_Score': 13, 'Engagement_Score': 15,
+        'Total_Repair_Markers': 17, 'Repair_Type': 13,
+        'Self_Corrections': 15, 'Clarification_Requests': 18,
+        'Confirmation_Checks': 17, 'Elaboration_Requests': 18,
+        'Repetitions': 12, 'Knowledge_Construction_Score': 20,
+        'Construction_Phase': 16, 'Joint_Attention': 15,
+        'Hypothesis_Markers': 17, 'Evidence_Markers': 15,
+        'Synthesis_Markers': 16, 'Perspective_Markers': 17,
+        'Social_Presence_Score': 17, 'Rapport_Index': 13,
+        'Acknowledgments': 14, 'Encouragements': 14,
+        'Empathy_Markers': 14, 'Solidarity_Markers': 16,
+        'Politeness_Markers': 16, 'Humor_Markers': 13,
+        'Argument_Structure': 16, 'Argument_Quality': 15,
+        'Claim_Markers': 13, 'Argument_Evidence_Markers': 20,
+        'Warrant_Markers': 14, 'Qualifier_Markers': 15,
+        'Rebuttal_Markers': 15, 'Temporal_Orientation': 17,
+        'Urgency_Level': 13, 'Urgency_Markers': 14,
+        'Reflection_Markers': 16, 'Projection_Markers': 16,
+        'Pace_Markers': 12,
+        # v3.2 columns
+        'IEI_Efficiency': 14, 'Lexical_Mirroring': 18, 'Cognitive_Asymmetry': 18, 'Refusal_Markers': 14
+    }
+    
+    for col_idx, col_name in enumerate(df.columns):
+        width = column_widths.get(col_name, 15)
+        ws.set_column(col_idx, col_idx, width, center_fmt)
+    
+    # Write main sheet to main output file
+    write_frame(ws, df, cells={(0, 0): back_link("Thread Summary")})
+
+
+# === Sentiment Parity Check ===
+def export_message_texts(conversations):
+    """Yield the text of every message of the mapping, including regenerated replies off the current branch"""
+    for chat in conversations:
+        for node in (chat.get("mapping") or {}).values():
+            m = message_row(node)
+            if m is not None:
+                yield m["content"]
+
+def check_sentiment_parity(texts, max_reported=10):
+    """
+    Score every text with the lexicon backend and with TextBlob and report
+    every text whose polarity or subjectivity differ. Returns the number of differences.
+    """
+    lexicon_backend = get_sentiment_backend("lexicon")
+    reference = get_sentiment_backend("textblob")
+    checked = mismatches = 0
+    for batch in iter(lambda: list(islice(texts, 1000)), []):
+        for text, fast, expected in zip(batch, lexicon_backend.score_batch(batch), reference.score_batch(batch)):
+            checked += 1
+            if fast != expected:
+                mismatches += 1
+                if mismatches <= max_reported:
+                    print(f"  ✗ {text[:60]!r}: lexicon {fast} != TextBlob {expected}")
+    print(f"Sentiment parity: {checked} texts checked, {mismatches} differences")
+    return mismatches
+
+
+# === Workbook Output ===
+# Both workbooks are written in xlsxwriter's constant_memory mode: every sheet is
+# streamed to disk row by row, so cells must be written in row order and a row
+# cannot be changed once a later row has been started.
+def open_workbook(path):
+    """Workbook streaming its sheets to disk (constant_memory mode)"""
+    return xlsxwriter.Workbook(path, {'constant_memory': True})
+
+def workbook_formats(workbook):
+    """Header and centered-cell formats shared by the sheets of a workbook"""
+    header_fmt = workbook.add_format({
+        'bold': True, 
+        'bg_color': '#4A90E2',
+        'font_color': 'white',
+        'align': 'center', 
+        'valign': 'vcenter',
+        'border': 1
+    })
+    center_fmt = workbook.add_format({'align': 'center', 'valign': 'vcenter'})
+    return header_fmt, center_fmt
+
+class SheetNames:
+    """
+    Unique sheet names of one workbook. Excel compares sheet names ignoring case
+    and allows 31 characters; threads often share a title ("New chat"), and a
+    streamed sheet cannot be written twice, so every sheet gets its own name.
+    """
+
+    def __init__(self, reserved=()):
+        self.used = {name.lower() for name in reserved}
+
+    def claim(self, name):
+        """`name` cut to 31 characters, ending in " (2)", " (3)", ... when that is taken"""
+        candidate, n = name[:31], 1
+        while candidate.lower() in self.used:
+            n += 1
+            marker = f" ({n})"
+            candidate = name[:31 - len(marker)] + marker
+        self.used.add(candidate.lower())
+        return candidate
+
+# Fixed sheets of the two workbooks, never used for a thread
+MAIN_SHEETS = ["Thread Summary", "Methodology Notes", "Branch Summary", "Performance"]
+MATRIX_SHEETS = ["Global_Act_Counts", "Global_Act_Prob", "Global_Correlation", "Summary", "README"]
+
+def excel_value(val):
+    """A DataFrame value converted as DataFrame.to_excel converts it"""
+    if pd.api.types.is_scalar(val) and pd.isna(val):
+        return ""
+    if isinstance(val, (bool, np.bool_)):
+        return bool(val)
+    if isinstance(val, (int, np.integer)):
+        return int(val)
+    if isinstance(val, (float, np.floating)):
+        if np.isinf(val):
+            return "inf" if val > 0 else "-inf"
+        return float(val)
+    return str(val)
+
+def back_link(sheet_name):
+    """Cell writer of a ⬅ BACK TO SUMMARY link to a sheet"""
+    return lambda ws, row, col: ws.write_url(row, col, f"internal:'{sheet_name}'!A1", string="⬅ BACK TO SUMMARY")
+
+def write_frame(ws, df, index=False, cells=None):
+    """
+    Write a DataFrame with the layout and values of DataFrame.to_excel, row by row.
+
+    Cells take their row and column formats, so set those first. `cells` maps (row, col) to a function(ws, row, col) that writes that cell
+    instead (links, formulas); cells below the frame are written after it.
+    """
+    overrides = defaultdict(dict)
+    for (row, col), write_cell in (cells or {}).items():
+        overrides[row][col] = write_cell
+    header = ([df.index.name] if index else []) + list(df.columns)
+    for row, values in enumerate(chain([header], df.itertuples(index=index, name=None))):
+        row_overrides = overrides.pop(row, {})
+        for col, val in enumerate(values):
+            if col not in row_overrides and not (row == 0 and index and col == 0 and val is None):
+                ws.write(row, col, excel_value(val))
+        for col, write_cell in sorted(row_overrides.items()):
+            write_cell(ws, row, col)
+    for row in sorted(overrides):
+        for col, write_cell in sorted(overrides[row].items()):
+            write_cell(ws, row, col)
+
+def write_matrix_sheet(workbook, sheet_name, df):
+    """Write a matrix (with its index) to a sheet of the matrix workbook"""
+    ws = workbook.add_worksheet(sheet_name)
+    ws.freeze_panes(1, 1)  # Freeze top row and first column
+    write_frame(ws, df, index=True, cells={(0, 0): back_link("Summary")})
+    return ws
+
+def write_summary_sheets(workbook, summary_df, header_fmt, center_fmt):
+    """Write the Thread Summary and Methodology Notes sheets of the main workbook"""
+    summary_ws = workbook.add_worksheet("Thread Summary")
     summary_ws.freeze_panes(1, 1)
-    summary_ws.set_row(0, None, header_fmt_main)
+    summary_ws.set_row(0, None, header_fmt)
     for col in range(len(summary_df.columns)):
-        summary_ws.set_column(col, col, 20, center_fmt_main)
-    # Add hyperlinks to threads
-    for i, thread in enumerate(summary_df["Thread"], start=1):
-        summary_ws.write_url(i, 0, f"internal:'{thread}'!A1", string=thread)
-    
+        summary_ws.set_column(col, col, 20, center_fmt)
+    # Hyperlinks to threads replace the thread names
+    thread_links = {
+        (i, 0): lambda ws, row, col, thread=thread: ws.write_url(row, col, f"internal:'{thread}'!A1", string=thread)
+        for i, thread in enumerate(summary_df["Thread"], start=1)}
+    write_frame(summary_ws, summary_df, cells=thread_links)
+
     # === Methodology Notes Sheet (main output) ===
-    notes_ws = main_writer.book.add_worksheet("Methodology Notes")
+    notes_ws = workbook.add_worksheet("Methodology Notes")
     notes_ws.set_column(0, 0, 100)
-    
+
     methodology_text = [
         "ENHANCED CHAT ANALYSIS TOOL v3.2 - METHODOLOGY NOTES",
         "=" * 80,
@@ -1752,58 +3267,164 @@ with pd.ExcelWriter(main_output_file, engine="xlsxwriter") as main_writer, \
         f"- Cognitive Asymmetry",
         f"- Refusal Markers",
     ]
-    
-    # =============================================================================
-    # WRITE MATRIX OUTPUT FILE (with guaranteed sheets, back links, and freeze panes)
-    # =============================================================================
-    print("\n" + "=" * 80)
-    print("WRITING MATRIX ANALYSIS FILE")
-    print("\n" + "=" * 80)
-    print("\n".join(process_notes))
-    print(f"\n✅ Main analysis exported to: {main_output_file}")
-    print(f"📊 Matrix analysis exported to: {matrix_output_file}")
-    print(f"📊 Total messages analyzed: {summary_df['Total Messages'].sum():,}")
-    print("\n📖 See methodology notes in main file for details.")
-    print("=" * 80)
 
+
+def write_branch_sheet(workbook, branch_df, header_fmt, center_fmt):
+    """Write the Branch Summary sheet (--branches all): one row per branch, linked to its thread"""
+    branch_ws = workbook.add_worksheet("Branch Summary")
+    branch_ws.freeze_panes(1, 2)
+    branch_ws.set_row(0, None, header_fmt)
+    for col in range(len(branch_df.columns)):
+        branch_ws.set_column(col, col, 20, center_fmt)
+    thread_links = {
+        (i, 0): lambda ws, row, col, thread=thread: ws.write_url(row, col, f"internal:'{thread}'!A1", string=thread)
+        for i, thread in enumerate(branch_df["Thread"], start=1)}
+    write_frame(branch_ws, branch_df, cells=thread_links)
+
+
+# === Matrix Tables ===
+def act_count_matrix(act_counts):
+    """
+    Square DataFrame of dialogue act transition counts (from act rows, to act columns)
+    restricted to the acts that occur in at least one transition
+    """
+    present = np.flatnonzero(act_counts.any(axis=0) | act_counts.any(axis=1))
+    acts = [DIALOGUE_ACTS[code] for code in present]
+    return pd.DataFrame(act_counts[np.ix_(present, present)], index=acts, columns=acts)
+
+def thread_correlation(numeric_df):
+    """Pearson correlation of a thread's numeric metrics, None with fewer than two messages or metrics"""
+    if numeric_df.shape[1] > 1 and numeric_df.shape[0] > 1:
+        return numeric_df.corr()
+    return None
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+class CorrelationAccumulator:
+    """
+    Global Pearson correlation of every numeric metric, folded in one thread at a time.
+
+    Keeps, for every pair of columns, the running count, means, sums of squared
+    deviations and cross-products of the messages where both values are present
+    and finite (pairwise deletion). The update is the same per-pair Welford
+    recurrence DataFrame.corr() runs, in the same message order, so the matrix
+    is identical to correlating one DataFrame of all messages while memory
+    stays at a few columns x columns arrays.
+    """
+
+    def __init__(self):
+        self.columns = []        # every column seen, in first-seen order
+        self.position = {}       # column -> index into the pair arrays
+        self.numeric = set()     # columns with numeric values in some thread
+        self.mixed = set()       # columns with non-numeric values in some thread
+        self.messages = 0
+        self.nobs = np.zeros((0, 0), dtype=np.int64)
+        self.mean = np.zeros((0, 0))   # mean[x, y]: mean of x over the messages of pair (x, y)
+        self.ssq = np.zeros((0, 0))    # ssq[x, y]: squared deviations of x over the same messages
+        self.cov = np.zeros((0, 0))    # cov[x, y]: cross-products of deviations
+
+    def _grow(self):
+        k, n = len(self.columns), self.nobs.shape[0]
+        for name in ("nobs", "mean", "ssq", "cov"):
+            old = getattr(self, name)
+            new = np.zeros((k, k), dtype=old.dtype)
+            new[:n, :n] = old
+            setattr(self, name, new)
+
+    def add(self, df):
+        """Fold in the messages (rows) of one thread"""
+        self.messages += len(df)
+        numeric = []
+        for column in df.columns:
+            if column not in self.position:
+                self.position[column] = len(self.columns)
+                self.columns.append(column)
+            # A column is numeric across all messages when every thread holds only
+            # numbers or missing values in it, as DataFrame type inference decides
+            values = df[column]
+            if pd.api.types.is_bool_dtype(values.dtype):
+                self.mixed.add(column)
+            elif pd.api.types.is_numeric_dtype(values.dtype):
+                self.numeric.add(column)
+                numeric.append(column)
+            else:
+                present = values.dropna()
+                if not all(_is_number(v) for v in present):
+                    self.mixed.add(column)
+                elif len(present):
+                    self.numeric.add(column)
+                    numeric.append(column)
+        if len(self.columns) > self.nobs.shape[0]:
+            self._grow()
+        if not numeric:
+            return
+        
+        idx = [self.position[column] for column in numeric]
+        pairs = np.ix_(idx, idx)
+        nobs, mean, ssq, cov = (a[pairs] for a in (self.nobs, self.mean, self.ssq, self.cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for v in df[numeric].to_numpy(dtype=float, na_value=np.nan):
+                both = np.isfinite(v)
+                both = both[:, None] & both[None, :]
+                nobs += both
+                vx = v[:, None]
+                dx = vx - mean
+                dy = v[None, :] - mean.T
+                np.copyto(mean, mean + 1. / nobs * dx, where=both)
+                np.copyto(ssq, ssq + (vx - mean) * dx, where=both)
+                np.copyto(cov, cov + (vx - mean) * dy, where=both)
+        for total, block in zip((self.nobs, self.mean, self.ssq, self.cov), (nobs, mean, ssq, cov)):
+            total[pairs] = block
+
+    def corr(self):
+        """
+        Pearson correlation of every numeric metric across all messages
+        None without messages, an empty DataFrame with fewer than two numeric columns
+        """
+        if not self.messages:
+            return None
+        columns = [c for c in self.columns
+                   if c in self.numeric and c not in self.mixed and 'seq' not in str(c).lower()]
+        if len(columns) <= 1:
+            return pd.DataFrame()
+        idx = [self.position[column] for column in columns]
+        pairs = np.ix_(idx, idx)
+        nobs, ssq, cov = self.nobs[pairs], self.ssq[pairs], self.cov[pairs]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            divisor = np.sqrt(ssq * ssq.T)
+            r = np.clip(np.where((nobs > 0) & (divisor != 0), cov / divisor, np.nan), -1, 1)
+        # DataFrame.corr() computes the lower triangle and mirrors it
+        r = np.tril(r) + np.tril(r, -1).T
+        return pd.DataFrame(r, index=columns, columns=columns)
+
+def write_matrix_workbook(workbook, global_act_counts, global_corr, thread_act_counts, thread_correlations,
+                          header_fmt, center_fmt):
+    """
+    Write the matrix workbook: global and per-thread act transition and
+    correlation matrices, a Summary sheet linking to all of them and a README
+    """
     matrix_sheets = []  # track sheets for summary
+    sheet_names = SheetNames(MATRIX_SHEETS)
 
     # --- 1. Global act transition matrices (if any data) ---
-    if global_act_counts:
-        all_acts = sorted(set(global_act_counts.keys()).union(*[d.keys() for d in global_act_counts.values()]))
-        # Counts matrix
-        global_counts_df = pd.DataFrame(0, index=all_acts, columns=all_acts)
-        for from_act, to_dict in global_act_counts.items():
-            for to_act, cnt in to_dict.items():
-                global_counts_df.loc[from_act, to_act] = cnt
+    if global_act_counts.any():
+        global_counts_df = act_count_matrix(global_act_counts)
         sheet_name = "Global_Act_Counts"
-        global_counts_df.to_excel(matrix_writer, sheet_name=sheet_name)
-        ws = matrix_writer.sheets[sheet_name]
-        ws.write_url('A1', "internal:'Summary'!A1", string="⬅ BACK TO SUMMARY")
-        ws.freeze_panes(1, 1)  # Freeze top row and first column
+        write_matrix_sheet(workbook, sheet_name, global_counts_df)
         matrix_sheets.append((sheet_name, "Global dialogue act transition counts"))
 
         # Probabilities matrix
         global_prob_df = global_counts_df.div(global_counts_df.sum(axis=1), axis=0).fillna(0)
         sheet_name = "Global_Act_Prob"
-        global_prob_df.to_excel(matrix_writer, sheet_name=sheet_name)
-        ws = matrix_writer.sheets[sheet_name]
-        ws.write_url('A1', "internal:'Summary'!A1", string="⬅ BACK TO SUMMARY")
-        ws.freeze_panes(1, 1)
+        write_matrix_sheet(workbook, sheet_name, global_prob_df)
         matrix_sheets.append((sheet_name, "Global dialogue act transition probabilities"))
 
     # --- 2. Global correlation matrix ---
-    if all_messages_list:
-        global_all_df = pd.DataFrame(all_messages_list)
-        global_numeric = global_all_df.select_dtypes(include=[np.number])
-        global_numeric = global_numeric.loc[:, ~global_numeric.columns.str.contains('Seq', case=False)]
-        if global_numeric.shape[1] > 1:
-            global_corr = global_numeric.corr()
+    if global_corr is not None:
+        if not global_corr.empty:
             sheet_name = "Global_Correlation"
-            global_corr.to_excel(matrix_writer, sheet_name=sheet_name)
-            ws = matrix_writer.sheets[sheet_name]
-            ws.write_url('A1', "internal:'Summary'!A1", string="⬅ BACK TO SUMMARY")
-            ws.freeze_panes(1, 1)
+            ws = write_matrix_sheet(workbook, sheet_name, global_corr)
             matrix_sheets.append((sheet_name, "Global cross‑metric correlation matrix"))
             # Apply conditional formatting
             ws.conditional_format(1, 1, len(global_corr), len(global_corr),
@@ -1813,53 +3434,35 @@ with pd.ExcelWriter(main_output_file, engine="xlsxwriter") as main_writer, \
                                    'max_color': "#63BE7B"})
         else:
             sheet_name = "Global_Correlation"
-            pd.DataFrame().to_excel(matrix_writer, sheet_name=sheet_name)
-            ws = matrix_writer.sheets[sheet_name]
-            ws.write_url('A1', "internal:'Summary'!A1", string="⬅ BACK TO SUMMARY")
-            ws.freeze_panes(1, 1)
+            write_matrix_sheet(workbook, sheet_name, pd.DataFrame())
             matrix_sheets.append((sheet_name, "Insufficient data for global correlation"))
 
     # --- 3. Per-thread matrices ---
     for thread_name in thread_act_counts:
-        acts = sorted(set(thread_act_counts[thread_name].keys()).union(*[d.keys() for d in thread_act_counts[thread_name].values()]))
-        if acts:
+        thread_counts_df = act_count_matrix(thread_act_counts[thread_name])
+        if not thread_counts_df.empty:
             # Counts
-            thread_counts_df = pd.DataFrame(0, index=acts, columns=acts)
-            for from_act, to_dict in thread_act_counts[thread_name].items():
-                for to_act, cnt in to_dict.items():
-                    thread_counts_df.loc[from_act, to_act] = cnt
-            sheet_name_counts = f"{thread_name}_ActCounts"[:31]
-            thread_counts_df.to_excel(matrix_writer, sheet_name=sheet_name_counts)
-            ws = matrix_writer.sheets[sheet_name_counts]
-            ws.write_url('A1', "internal:'Summary'!A1", string="⬅ BACK TO SUMMARY")
-            ws.freeze_panes(1, 1)
+            sheet_name_counts = sheet_names.claim(f"{thread_name}_ActCounts")
+            write_matrix_sheet(workbook, sheet_name_counts, thread_counts_df)
             matrix_sheets.append((sheet_name_counts, f"Act counts for thread: {thread_name}"))
 
             # Probabilities
             thread_prob_df = thread_counts_df.div(thread_counts_df.sum(axis=1), axis=0).fillna(0)
-            sheet_name_prob = f"{thread_name}_ActProb"[:31]
-            thread_prob_df.to_excel(matrix_writer, sheet_name=sheet_name_prob)
-            ws = matrix_writer.sheets[sheet_name_prob]
-            ws.write_url('A1', "internal:'Summary'!A1", string="⬅ BACK TO SUMMARY")
-            ws.freeze_panes(1, 1)
+            sheet_name_prob = sheet_names.claim(f"{thread_name}_ActProb")
+            write_matrix_sheet(workbook, sheet_name_prob, thread_prob_df)
             matrix_sheets.append((sheet_name_prob, f"Act probabilities for thread: {thread_name}"))
 
         # Correlation for this thread
-        if thread_name in thread_numeric_data:
-            numeric_df = thread_numeric_data[thread_name]
-            if numeric_df.shape[1] > 1 and numeric_df.shape[0] > 1:
-                corr = numeric_df.corr()
-                sheet_name_corr = f"{thread_name}_Corr"[:31]
-                corr.to_excel(matrix_writer, sheet_name=sheet_name_corr)
-                ws = matrix_writer.sheets[sheet_name_corr]
-                ws.write_url('A1', "internal:'Summary'!A1", string="⬅ BACK TO SUMMARY")
-                ws.freeze_panes(1, 1)
-                matrix_sheets.append((sheet_name_corr, f"Correlation matrix for thread: {thread_name}"))
-                ws.conditional_format(1, 1, len(corr), len(corr),
-                                      {'type': '3_color_scale',
-                                       'min_color': "#F8696B",
-                                       'mid_color': "#FFEB84",
-                                       'max_color': "#63BE7B"})
+        corr = thread_correlations.get(thread_name)
+        if corr is not None:
+            sheet_name_corr = sheet_names.claim(f"{thread_name}_Corr")
+            ws = write_matrix_sheet(workbook, sheet_name_corr, corr)
+            matrix_sheets.append((sheet_name_corr, f"Correlation matrix for thread: {thread_name}"))
+            ws.conditional_format(1, 1, len(corr), len(corr),
+                                  {'type': '3_color_scale',
+                                   'min_color': "#F8696B",
+                                   'mid_color': "#FFEB84",
+                                   'max_color': "#63BE7B"})
 
     # --- 4. Create Summary Sheet with hyperlinks in the "Sheet Name" column ---
     if matrix_sheets:
@@ -1872,22 +3475,23 @@ with pd.ExcelWriter(main_output_file, engine="xlsxwriter") as main_writer, \
                 "Description": description
             })
         summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(matrix_writer, sheet_name="Summary", index=False)
 
-        summary_ws = matrix_writer.sheets["Summary"]
+        summary_ws = workbook.add_worksheet("Summary")
         # Freeze header row (row 0) and first column (col 0) – optional but consistent
         summary_ws.freeze_panes(1, 1)
-        summary_ws.set_row(0, None, header_fmt_matrix)
-        summary_ws.set_column(0, 0, 5, center_fmt_matrix)   # # column
+        summary_ws.set_row(0, None, header_fmt)
+        summary_ws.set_column(0, 0, 5, center_fmt)   # # column
         summary_ws.set_column(1, 1, 35)                     # Sheet Name column (will be hyperlinks)
         summary_ws.set_column(2, 2, 50)                     # Description column
 
-        # Overwrite the "Sheet Name" cells (column B, starting from row 2) with HYPERLINK formulas
+        # Replace the "Sheet Name" cells (column B, starting from row 2) with HYPERLINK formulas
+        sheet_links = {}
         for i, row in enumerate(summary_data, start=2):  # row 1 is header, data rows start at 2
             sheet_name = row["Sheet Name"]
             # Write formula: =HYPERLINK("#'sheetname'!A1", "sheetname")
             formula = f'=HYPERLINK("#\'{sheet_name}\'!A1", "{sheet_name}")'
-            summary_ws.write_formula(i, 1, formula)  # column B (index 1)
+            sheet_links[(i, 1)] = lambda ws, row, col, formula=formula: ws.write_formula(row, col, formula)
+        write_frame(summary_ws, summary_df, cells=sheet_links)
 
     # --- 5. Always create a README sheet (even if no other sheets) ---
     readme = [
@@ -1911,13 +3515,331 @@ with pd.ExcelWriter(main_output_file, engine="xlsxwriter") as main_writer, \
         readme.append("    * <Thread>_ActCounts / Prob: act transition matrices for that thread.")
         readme.append("    * <Thread>_Corr: correlation matrix for that thread (if enough data).")
     readme.append("")
-    readme.append("Note: Sheet names are truncated to 31 characters.")
+    readme.append("Note: Sheet names are truncated to 31 characters; threads sharing a name are numbered (2), (3), ...")
 
-    readme_ws = workbook_matrix.add_worksheet("README")
+    readme_ws = workbook.add_worksheet("README")
     for i, line in enumerate(readme):
-        readme_ws.write(i, 0, line)
+        # Add a back link from README to Summary (if Summary exists) in place of the title
+        if i == 0 and matrix_sheets:
+            back_link("Summary")(readme_ws, 0, 0)
+        else:
+            readme_ws.write(i, 0, line)
     readme_ws.set_column(0, 0, 80)
-    # Add a back link from README to Summary (if Summary exists)
-    if matrix_sheets:
-        readme_ws.write_url('A1', "internal:'Summary'!A1", string="⬅ BACK TO SUMMARY")
     readme_ws.freeze_panes(1, 1)  # Freeze top row and first column for README too
+
+
+# === Columnar Dataset Output ===
+# Columns that may hold only missing values in a thread, stored with their real
+# type so every partition of the dataset has the same schema
+DATASET_FLOAT_COLUMNS = {"response_time", "edit_similarity"} | {
+    column for fields in MESSAGE_METRICS.values() for _, column, kind in fields if kind in ('float', 'optional')}
+
+class ParquetDataset:
+    """
+    Partitioned Parquet dataset with the same content as the two workbooks.
+
+    messages/thread=<n>/part-0.parquet holds the per-message metrics of the n-th
+    thread of the input; thread_summary, act_transitions, global_correlation,
+    thread_correlations and (with --branches all) branch_summary are single
+    tables in long (tidy) form. Needs pyarrow.
+    """
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.threads = []               # (thread, untruncated title) in write order
+        self.transitions = []           # (thread, from act, to act, count) rows
+        self.thread_correlations = []   # per-thread correlation_pairs frames
+        self.branches = []              # --branches all summary rows, with thread and title
+        os.makedirs(os.path.join(path, "messages"), exist_ok=True)
+
+    def _table(self, df):
+        """Arrow table of a DataFrame; all-missing columns get their real type instead of null"""
+        pa = self.pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        fields = [pa.field(field.name, pa.float64() if field.name in DATASET_FLOAT_COLUMNS else pa.string())
+                  if pa.types.is_null(field.type) else field
+                  for field in table.schema]
+        return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+    def write_table(self, name, df):
+        self.pq.write_table(self._table(df), os.path.join(self.path, f"{name}.parquet"))
+
+    def write_thread(self, thread, title, df, act_transitions, corr, branch_rows=None):
+        """Write one thread's per-message metrics as its own partition and keep its matrix and branch rows"""
+        partition = os.path.join(self.path, "messages", f"thread={thread}")
+        os.makedirs(partition, exist_ok=True)
+        self.pq.write_table(self._table(df.assign(title=title)), os.path.join(partition, "part-0.parquet"))
+        self.threads.append((thread, title))
+        self.transitions.extend((thread, DIALOGUE_ACTS[from_code], DIALOGUE_ACTS[to_code], act_transitions[from_code, to_code])
+                                for from_code, to_code in zip(*np.nonzero(act_transitions)))
+        if corr is not None:
+            self.thread_correlations.append(correlation_pairs(corr).assign(thread=thread))
+        self.branches.extend(dict(row, thread=thread, title=title) for row in branch_rows or ())
+
+    def write_tables(self, summary_df, global_corr):
+        """Write the thread summary (rows in write_thread order), transition and correlation tables"""
+        threads, titles = zip(*self.threads) if self.threads else ((), ())
+        self.write_table("thread_summary", summary_df.assign(thread=list(threads), title=list(titles)))
+        self.write_table("act_transitions", pd.DataFrame(
+            self.transitions, columns=["thread", "from_act", "to_act", "count"]))
+        if global_corr is not None and not global_corr.empty:
+            self.write_table("global_correlation", correlation_pairs(global_corr))
+        if self.thread_correlations:
+            self.write_table("thread_correlations", pd.concat(self.thread_correlations, ignore_index=True))
+        if self.branches:
+            self.write_table("branch_summary", pd.DataFrame(self.branches))
+
+def correlation_pairs(corr):
+    """Correlation matrix as one (metric_x, metric_y, r) row per cell"""
+    return corr.rename_axis(index="metric_x").reset_index().melt(
+        id_vars="metric_x", var_name="metric_y", value_name="r")
+
+
+# === Command Line ===
+def parse_args(argv=None):
+    """Parse command-line options; defaults come from the Configuration section"""
+    parser = argparse.ArgumentParser(description="ChatGPT-DialogueMetrics: analyze ChatGPT conversation exports")
+    parser.add_argument("inputs", nargs="*", metavar="input",
+                        help=f"ChatGPT export JSON files, or folders of them; conversations repeated "
+                             f"across exports are analyzed once (default: {input_file})")
+    parser.add_argument("--keep", choices=["latest", "longest"], default=dedupe_keep,
+                        help="copy of a conversation found in several exports to analyze: most recently "
+                             "updated, or most messages (default: %(default)s)")
+    selection = parser.add_argument_group("conversation selection (applied while reading the input)")
+    selection.add_argument("--title", metavar="REGEX", default=title_filter,
+                           help="only conversations whose title matches this regular expression (case-insensitive)")
+    selection.add_argument("--id", dest="ids", metavar="ID", action="append", default=list(conversation_ids),
+                           help="only this conversation id (repeatable)")
+    selection.add_argument("--since", metavar="DATE", type=parse_time_bound,
+                           help="only conversations created at or after this time (YYYY-MM-DD[ HH:MM:SS], local)")
+    selection.add_argument("--until", metavar="DATE", type=parse_time_bound,
+                           help="only conversations created before this time (YYYY-MM-DD[ HH:MM:SS], local)")
+    selection.add_argument("--model", dest="models", metavar="SLUG", action="append", default=list(model_filter),
+                           help="only conversations that used this model_slug (repeatable)")
+    selection.add_argument("--min-messages", type=int, default=min_messages,
+                           help="only conversations with at least this many messages (default: %(default)s)")
+    selection.add_argument("--shard", metavar="i/N", type=parse_shard, default=shard,
+                           help="only the i-th (0-based) of N disjoint shards, by conversation id hash; "
+                                "run every i to split an export across machines")
+    selection.add_argument("--sample", metavar="FRACTION", type=float, default=sample_fraction,
+                           help="only a stable pseudo-random sample of this fraction of conversations, e.g. 0.01")
+    parser.add_argument("--workers", type=int, default=workers,
+                        help="processes used to analyze conversations in parallel (default: %(default)s)")
+    parser.add_argument("--pattern-engine", choices=["scan", "vectorized"], default=pattern_engine,
+                        help="scan each message separately, or count every pattern over a whole thread at once "
+                             "(default: %(default)s)")
+    parser.add_argument("--sentiment-backend", choices=sorted(SENTIMENT_BACKENDS), default=sentiment_backend,
+                        help="sentiment scorer: batched lexicon scorer or TextBlob itself (default: %(default)s)")
+    parser.add_argument("--check-sentiment", nargs="?", const="", metavar="EXPORT",
+                        help="only compare the lexicon sentiment backend with TextBlob and report differences: "
+                             "on the built-in test corpus, or on every message of EXPORT when given")
+    parser.add_argument("--edit-similarity", choices=["exact", "tiered"], default=edit_similarity,
+                        help="tiered: skip the exact similarity of consecutive assistant messages that are "
+                             "clearly not edits and report an upper bound instead (default: %(default)s)")
+    parser.add_argument("--skip-mt-metrics", action="store_true", default=skip_mt_metrics,
+                        help="do not compute BLEU/METEOR/ROUGE and leave their columns out of the output")
+    parser.add_argument("--output-format", choices=["xlsx", "parquet", "both"], default=output_format,
+                        help="xlsx: the two workbooks; parquet: a partitioned Parquet dataset with the same "
+                             "content; both: all of them (default: %(default)s)")
+    parser.add_argument("--dataset-dir", metavar="PATH", default=dataset_output_dir,
+                        help="directory of the Parquet dataset (default: %(default)s)")
+    parser.add_argument("--branches", choices=["current", "all"], default=branch_mode,
+                        help="analyze the branch last shown in ChatGPT, or also summarize every "
+                             "regenerated/edited branch in a Branch Summary sheet")
+    parser.add_argument("--profile", metavar="PATH", default=profile_file,
+                        help="write per-stage timings, throughput, peak memory and cache hit rates "
+                             "to this .json or .csv file")
+    parser.add_argument("--performance-sheet", action="store_true", default=performance_sheet,
+                        help="also add the profile as a Performance sheet of the main workbook")
+    parser.add_argument("--cache", metavar="PATH", default=cache_file,
+                        help="SQLite file caching per-message metrics between runs (default: no cache)")
+    parser.add_argument("--cache-max-entries", type=int, default=cache_max_entries,
+                        help="entries kept in the cache, least recently used dropped first (default: %(default)s)")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="empty the cache before analyzing")
+    parser.add_argument("--incremental", action="store_true", default=incremental,
+                        help="save each thread's state in the cache and, on later runs, analyze only "
+                             "messages added since (requires --cache)")
+    args = parser.parse_args(argv)
+    args.inputs = export_files(args.inputs or [input_file])
+    if not args.inputs:
+        parser.error("no .json export files found in the given folders")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.sample is not None and not 0 < args.sample <= 1:
+        parser.error("--sample must be a fraction in (0, 1]")
+    if args.min_messages < 0:
+        parser.error("--min-messages must not be negative")
+    if args.cache_max_entries < 1:
+        parser.error("--cache-max-entries must be at least 1")
+    if args.incremental and not args.cache:
+        parser.error("--incremental requires --cache")
+    if args.output_format != "xlsx" and importlib.util.find_spec("pyarrow") is None:
+        parser.error("--output-format parquet/both requires pyarrow (pip install pyarrow)")
+    if args.performance_sheet and args.output_format == "parquet":
+        parser.error("--performance-sheet needs the workbooks (--output-format xlsx or both)")
+    return args
+
+# === MAIN PROCESSING ===
+def main(argv=None):
+    args = parse_args(argv)
+    inputs = ", ".join(args.inputs)
+    workers = args.workers
+    
+    print("=" * 80)
+    print("ChatGPT-DialogueMetrics v3.2")
+    print("SPDX-License-Identifier: LicenseRef-RCNM-1.0")  
+    print("Version: 1.0")
+    print("Status: Custom Research License")
+    print("Author: R.Rex (Collaborated with ChatGPT, Claude, Kimi, Deepseek, & Gemini)")
+    print("Year: 2026")  
+    print("=" * 80)
+    if args.check_sentiment is not None:
+        texts = (export_message_texts(iter_conversations(args.check_sentiment)) if args.check_sentiment
+                 else iter(SENTIMENT_PARITY_CORPUS))
+        raise SystemExit(1 if check_sentiment_parity(texts) else 0)
+
+    print(f"\nLoading: {inputs}")
+
+    selection = ConversationFilter(args)
+    conversations = iter_unique_conversations(args.inputs, args.keep)
+    if selection.active:
+        conversations = selection(conversations)
+
+    cache = get_metric_cache(args)
+    if cache is not None:
+        if args.clear_cache:
+            cache.clear()
+        purged = cache.purge_stale()
+        print(f"Metric cache: {args.cache}" + (f" ({purged} outdated entries dropped)" if purged else ""))
+
+    summary_rows = []
+    branch_rows = []
+    process_notes = []
+
+    # Structures for matrix analysis
+    global_act_counts = act_transition_counts([])                      # global transition counts
+    global_correlation = CorrelationAccumulator()                      # for global correlation
+
+    # Per-thread matrix storage
+    thread_act_counts = {}      # dict: thread_name -> transition count array over DIALOGUE_ACTS
+    thread_correlations = {}    # dict: thread_name -> correlation matrix (None with too little data)
+    thread_names = SheetNames(MAIN_SHEETS)   # thread_name: the thread's unique sheet name
+
+    write_excel = args.output_format in ("xlsx", "both")
+    profile = RunProfile() if profiling_enabled(args) else None
+
+    print(f"Streaming conversations from {inputs}...\n")
+
+    # Output files are only created once there is a first thread to write
+    results = (result for result in iter_analyses(conversations, workers, args) if result is not None)
+    first = next(results, None)
+    if first is None:
+        if selection.active:
+            print(f"Selected {selection.selected} of {selection.seen} conversations")
+        print("⚠️  No conversations with messages to analyze, no output written")
+        if cache is not None:
+            cache.close()
+        return
+    dataset = ParquetDataset(args.dataset_dir) if args.output_format in ("parquet", "both") else None
+
+    # === Create two streaming Excel workbooks (unless only the dataset is written) ===
+    with ExitStack() as outputs:
+        workbook_main = workbook_matrix = None
+        if write_excel:
+            workbook_main = outputs.enter_context(open_workbook(main_output_file))
+            workbook_matrix = outputs.enter_context(open_workbook(matrix_output_file))
+            main_formats = workbook_formats(workbook_main)
+            matrix_formats = workbook_formats(workbook_matrix)
+
+        for result in chain([first], results):
+            safe_title = thread_names.claim(result["safe_title"])
+            df = result["df"]
+            output_timer = StageTimer(profile is not None)
+        
+            thread_corr = thread_correlation(result["numeric_df"])
+            output_timer.lap("thread_correlation")
+        
+            # Each thread's sheet is streamed to disk as soon as it is analyzed
+            if workbook_main is not None:
+                write_thread_sheet(workbook_main, safe_title, df, *main_formats)
+                output_timer.lap("excel_write")
+            thread_branch_rows = [dict(row, Thread=safe_title) for row in result["branch_rows"] or ()]
+            if dataset is not None:
+                dataset.write_thread(result["chat_idx"], result["title"], df,
+                                     result["act_transitions"], thread_corr, thread_branch_rows)
+                output_timer.lap("dataset_write")
+            summary_rows.append(dict(result["summary_row"], Thread=safe_title))
+            branch_rows.extend(thread_branch_rows)
+        
+            # --- Global and per-thread act transitions ---
+            thread_act_counts[safe_title] = result["act_transitions"]
+            global_act_counts += result["act_transitions"]
+        
+            # --- Global correlation, folded in thread by thread (message text is never numeric) ---
+            global_correlation.add(df.drop(columns="content"))
+            output_timer.lap("global_correlation")
+        
+            thread_correlations[safe_title] = thread_corr
+            if profile is not None:
+                profile.add_thread(result, output_timer.stages)
+        
+            process_notes.append(f"✅ '{result['title']}' -> {len(df)} messages analyzed")
+    
+        if selection.active:
+            print(f"Selected {selection.selected} of {selection.seen} conversations")
+        run_timer = StageTimer(profile is not None)
+        summary_df = pd.DataFrame(summary_rows)
+        global_corr = global_correlation.corr()
+        run_timer.lap("global_correlation")
+        if workbook_main is not None:
+            write_summary_sheets(workbook_main, summary_df, *main_formats)
+            if branch_rows:
+                write_branch_sheet(workbook_main, pd.DataFrame(branch_rows), *main_formats)
+            run_timer.lap("excel_write")
+        if dataset is not None:
+            dataset.write_tables(summary_df, global_corr)
+            run_timer.lap("dataset_write")
+    
+        # =============================================================================
+        # WRITE MATRIX OUTPUT FILE (with guaranteed sheets, back links, and freeze panes)
+        # =============================================================================
+        print("\n" + "=" * 80)
+        print("WRITING MATRIX ANALYSIS FILE")
+        print("\n" + "=" * 80)
+        print("\n".join(process_notes))
+        if write_excel:
+            print(f"\n✅ Main analysis exported to: {main_output_file}")
+            print(f"📊 Matrix analysis exported to: {matrix_output_file}")
+        if dataset is not None:
+            print(f"\n🗂️  Dataset exported to: {dataset.path}")
+        print(f"📊 Total messages analyzed: {summary_df['Total Messages'].sum():,}")
+        if write_excel:
+            print("\n📖 See methodology notes in main file for details.")
+        print("=" * 80)
+
+        if workbook_matrix is not None:
+            write_matrix_workbook(workbook_matrix, global_act_counts, global_corr, thread_act_counts,
+                                  thread_correlations, *matrix_formats)
+            run_timer.lap("excel_write")
+
+        if profile is not None:
+            profile.run_stages = run_timer.stages
+            if args.performance_sheet:
+                write_performance_sheet(workbook_main, profile, *main_formats)
+            if args.profile:
+                profile.write(args.profile)
+                print(f"⏱️  Profile written to: {args.profile}")
+
+    if cache is not None:
+        evicted = cache.evict()
+        if evicted:
+            print(f"Metric cache: {evicted} least recently used entries evicted")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()